@@ -5,113 +5,565 @@ Usa textos de /data/ y fuentes de /fonts/ para crear imágenes de líneas y pala
 """
 
 import os
+import io
+import sys
 import json
+import time
+import queue
+import struct
+import tarfile
+import zlib
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
+from fontTools.ttLib import TTFont
 import random
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, Counter, deque
 import re
 from tqdm import tqdm
 import multiprocessing as mp
-from functools import partial
+from functools import partial, lru_cache
+from itertools import count, islice
 import platform
 
+try:
+    import orjson  # Opcional: serialización JSON mucho más rápida
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa  # Opcional: solo para --output-format parquet
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 
 # ============================================================================
 # FUNCIONES GLOBALES PARA MULTIPROCESSING
 # ============================================================================
 
-def _generate_single_image(task, target_height=128):
+# Palabras clave de estilo en nombres de archivo de fuente, en una sola regex
+_STYLE_RE = re.compile(r'(bold|bd|heavy|black|italic|oblique)')
+_BOLD_TAGS = frozenset(['bold', 'bd', 'heavy', 'black'])
+_ITALIC_TAGS = frozenset(['italic', 'oblique'])
+
+
+def _classify_font_style(file_name):
+    """
+    Clasifica un archivo de fuente por las palabras clave de su nombre
+
+    Returns:
+        'bold', 'italic', 'normal' o None (bold-italic y similares)
+    """
+    # Un solo escaneo del nombre para todas las palabras clave
+    tags = set(_STYLE_RE.findall(file_name.lower()))
+    if not tags:
+        return 'normal'
+    is_bold = not tags.isdisjoint(_BOLD_TAGS)
+    is_italic = not tags.isdisjoint(_ITALIC_TAGS)
+    if is_bold and not is_italic:
+        return 'bold'
+    if is_italic and not is_bold:
+        return 'italic'
+    return None
+
+
+def _dumps_json(entry):
+    """Serializa una entrada de metadata a JSON en UTF-8 (bytes)"""
+    if orjson is not None:
+        return orjson.dumps(entry)
+    return json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+
+# Hilos para leer los archivos de texto del corpus
+_TEXT_READ_WORKERS = 8
+
+
+def _read_text_chunks(path):
+    """
+    Lee un archivo de texto y lo divide en grupos de 5 palabras por línea
+
+    Se lee línea a línea: el archivo nunca se carga entero en memoria como
+    str ni como lista de líneas (split() ya ignora espacios sobrantes y
+    líneas vacías).
+
+    Returns:
+        lista de textos (str) en orden de aparición
+    """
+    chunks = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            words = line.split()
+            chunks.extend(' '.join(words[i:i + 5]) for i in range(0, len(words), 5))
+    return chunks
+
+
+# Clave de estadísticas para cada split
+_SPLIT_STATS = {'train': 'train_samples', 'validation': 'val_samples', 'test': 'test_samples'}
+
+# Caché de fuentes por proceso, acotada: cada worker la rellena de forma
+# perezosa, así cada fuente se parsea una vez por proceso en lugar de una vez
+# por imagen. El límite evita que crezca sin fin con muchas fuentes × tamaños
+@lru_cache(maxsize=512)
+def _load_font(font_path, font_size):
+    """Parsea la fuente con FreeType (cacheado por (ruta, tamaño))"""
+    return ImageFont.truetype(font_path, font_size)
+
+
+def _get_font(font_path, font_size):
+    """Devuelve un ImageFont cacheado para (ruta, tamaño)"""
+    # Normalizar a str: Path y str de la misma ruta comparten entrada
+    return _load_font(str(font_path), font_size)
+
+
+# Caracteres soportados por cada fuente (según su cmap): {ruta: frozenset}
+_CHARSET_CACHE = {}
+
+
+def _get_font_charset(font_path):
+    """
+    Devuelve el conjunto de caracteres que la fuente tiene en su cmap
+
+    Returns:
+        frozenset de caracteres, o None si no se pudo leer el cmap (en ese
+        caso no se filtra y se deja que el renderizado decida)
+    """
+    key = str(font_path)
+    if key not in _CHARSET_CACHE:
+        try:
+            with TTFont(key, lazy=True) as ttfont:
+                cmap = ttfont.getBestCmap() or {}
+            _CHARSET_CACHE[key] = frozenset(map(chr, cmap))
+        except Exception:
+            _CHARSET_CACHE[key] = None
+    return _CHARSET_CACHE[key]
+
+
+# Tamaño de la fuente de prueba con el que se leen las métricas
+_PROBE_FONT_SIZE = 64
+
+
+@lru_cache(maxsize=512)
+def _fit_font_size(font_path, target_height):
+    """
+    Calcula el tamaño de fuente cuyo alto de línea (ascent + descent)
+    ocupa el 80% de la altura objetivo
+
+    Las métricas escalan linealmente con el tamaño, así que basta con
+    leerlas una vez a un tamaño de prueba. El resultado es el mismo para
+    todos los textos de la fuente: no hace falta medir cada texto dos veces.
+    """
+    ascent, descent = _get_font(font_path, _PROBE_FONT_SIZE).getmetrics()
+    line_height = ascent + descent
+    if line_height <= 0:
+        return int(target_height * 0.7)
+    return max(1, int(_PROBE_FONT_SIZE * target_height * 0.8 / line_height))
+
+
+def _fit_text(text, font_path, target_height):
+    """
+    Devuelve (font, bbox) con los que `text` cabe en la altura objetivo
+
+    Parte del tamaño de _fit_font_size. Algunas fuentes (trazos decorativos,
+    swashes) dibujan tinta más allá de ascent + descent: si el texto no cabe,
+    se reduce el tamaño en proporción en lugar de recortar la tinta por
+    arriba y abajo. getbbox solo hace el layout, sin rasterizar.
+    """
+    font_size = _fit_font_size(str(font_path), target_height)
+    font = _get_font(font_path, font_size)
+    bbox = font.getbbox(text)
+    while bbox[3] - bbox[1] > target_height and font_size > 1:
+        font_size = max(1, min(font_size - 1, font_size * target_height // (bbox[3] - bbox[1])))
+        font = _get_font(font_path, font_size)
+        bbox = font.getbbox(text)
+    return font, bbox
+
+
+def _render_text_image(text, font_path, target_height=128):
+    """
+    Renderiza un texto con altura fija y ancho variable (estilo IAM/TrOCR)
+
+    Función de módulo para que la usen tanto el modo secuencial como los
+    workers de multiprocessing (no depende de `self`).
+
+    Args:
+        text: Texto a renderizar
+        font_path: Ruta a la fuente
+        target_height: Altura objetivo en píxeles
+
+    Returns:
+        PIL.Image
+    """
+    # Tamaño calculado a partir de las métricas de la fuente (una vez por
+    # fuente y altura), reducido solo si el texto no cabe. El texto se
+    # rasteriza una única vez, al dibujarlo
+    font, (left, top, right, bottom) = _fit_text(text, font_path, target_height)
+    text_width, text_height = right - left, bottom - top
+
+    # Crear imagen: altura fija, ancho variable (como IAM)
+    img_width = max(text_width, 10)  # Mínimo 10px de ancho
+    img_height = target_height
+
+    # Crear imagen en escala de grises (8 bits): texto negro sobre blanco,
+    # un solo canal en lugar de 3 idénticos (RGB)
+    img = Image.new('L', (img_width, img_height), 255)
+
+    # Centrar texto verticalmente: la tinta empieza en `top` por debajo del
+    # punto de anclaje
+    y = (target_height - text_height) // 2
+    ImageDraw.Draw(img).text((0, y - top), text, font=font, fill=0)
+
+    return img
+
+
+# Cabecera fija de todo archivo PNG
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(chunk_type, data):
+    """Empaqueta un chunk PNG: longitud + tipo + datos + CRC32"""
+    return (struct.pack('>I', len(data)) + chunk_type + data
+            + struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+
+def _encode_png(img, compress_level=1):
+    """
+    Codifica una imagen a PNG en memoria
+
+    Con compress_level=1 el deflate es mucho más barato que el nivel por
+    defecto (6) y, para texto negro sobre blanco, los archivos apenas crecen.
+
+    Las imágenes en escala de grises ('L', las que genera este script) se
+    codifican a mano: IHDR + un solo IDAT con las filas sin filtro + IEND.
+    Se evita la preparación del codificador PNG de Pillow en cada imagen y,
+    para texto sobre fondo liso, el resultado incluso ocupa algo menos.
+    """
+    if img.mode != 'L':
+        buf = io.BytesIO()
+        img.save(buf, format='PNG', compress_level=compress_level)
+        return buf.getvalue()
+
+    width, height = img.size
+    pixels = img.tobytes()
+    # Cada fila va precedida de su tipo de filtro (0 = ninguno)
+    raw = b''.join(b'\x00' + pixels[row:row + width]
+                   for row in range(0, width * height, width))
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)  # 8 bits, gris
+    return (_PNG_SIGNATURE
+            + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(raw, compress_level))
+            + _png_chunk(b'IEND', b''))
+
+
+class _ImageWriter:
+    """
+    Escribe imágenes ya codificadas a disco desde un pool de hilos
+
+    Desacopla la escritura (syscalls, espera de disco) del renderizado: el
+    bucle principal solo codifica y encola. La cola está acotada para que un
+    disco lento no acumule en RAM todas las imágenes pendientes.
+
+    Las muestras que no se pudieron escribir quedan en `failed` como
+    (directorio del split, nombre de archivo), para quitarlas de la metadata.
+    """
+
+    def __init__(self, max_workers=4, max_pending=256):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.failed = []
+
+    def submit(self, path, data):
+        """Encola la escritura de `data` en `path` (bloquea si la cola está llena)"""
+        path = Path(path)
+        self._slots.acquire()
+        future = self._executor.submit(path.write_bytes, data)
+        future.add_done_callback(partial(self._on_done, path))
+
+    def _on_done(self, path, future):
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            self.failed.append((path.parent, path.name))
+            print(f"\n[ERROR] Writer failed: {error}", file=sys.stderr)
+
+    def close(self):
+        """Espera a que terminen todas las escrituras pendientes"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ShardWriter:
+    """
+    Escribe las muestras en shards .tar (estilo WebDataset) en lugar de
+    archivos sueltos: millones de PNG pequeños se convierten en unos pocos
+    archivos grandes escritos secuencialmente
+
+    tarfile no es thread-safe, así que un único hilo escribe todos los shards
+    a partir de una cola acotada. Se mantienen abiertos como máximo `max_open`
+    shards; si llega una muestra de un shard ya cerrado se reabre en modo
+    append (las tareas van agrupadas por fuente, así que es raro).
+
+    Si falla la escritura de un lote, todos sus miembros quedan en `failed`
+    como (directorio del split, nombre) y el shard deja de usarse: tras un
+    addfile a medias el resto del archivo ya no sería fiable.
+    """
+
+    def __init__(self, max_open=64, max_pending=256):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._open = OrderedDict()
+        self._created = set()
+        self._max_open = max_open
+        self._mtime = int(time.time())
+        self._broken = set()
+        self.failed = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, shard_path, members):
+        """Encola [(nombre, bytes), ...] para añadirlos juntos a `shard_path`"""
+        self._queue.put((Path(shard_path), members))
+
+    def _get_tar(self, shard_path):
+        tar = self._open.get(shard_path)
+        if tar is not None:
+            self._open.move_to_end(shard_path)
+            return tar
+
+        if len(self._open) >= self._max_open:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+
+        # 'w' la primera vez (sobrescribe shards de ejecuciones anteriores)
+        mode = 'a' if shard_path in self._created else 'w'
+        tar = tarfile.open(shard_path, mode)
+        self._created.add(shard_path)
+        self._open[shard_path] = tar
+        return tar
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            shard_path, members = item
+            if shard_path in self._broken:
+                self.failed.extend((shard_path.parent, name) for name, _ in members)
+                continue
+
+            try:
+                tar = self._get_tar(shard_path)
+                for name, data in members:
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    info.mtime = self._mtime
+                    info.mode = 0o644
+                    tar.addfile(info, io.BytesIO(data))
+            except Exception as e:
+                self.failed.extend((shard_path.parent, name) for name, _ in members)
+                self._broken.add(shard_path)
+                tar = self._open.pop(shard_path, None)
+                if tar is not None:
+                    try:
+                        tar.close()
+                    except Exception:
+                        pass
+                print(f"\n[ERROR] Writer failed: {e}", file=sys.stderr)
+
+        for shard_path, tar in self._open.items():
+            try:
+                tar.close()
+            except Exception as e:
+                print(f"\n[ERROR] Writer failed closing {shard_path}: {e}", file=sys.stderr)
+        self._open.clear()
+
+    def close(self):
+        """Espera a que se escriban todas las muestras y cierra los shards"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ParquetWriter:
+    """
+    Escribe las muestras en un archivo Parquet por split (data.parquet) con
+    la imagen PNG como columna de bytes: escritura secuencial en bloques
+    grandes en lugar de millones de archivos pequeños
+
+    Igual que _ShardWriter, un único hilo escribe a partir de una cola
+    acotada. Las filas se agrupan en row groups de `rows_per_group`. El
+    esquema lleva las features de HuggingFace en sus metadatos, así que
+    `load_dataset('parquet', ...)` decodifica la columna 'image' como Image.
+
+    Las filas de un row group que no se pudo escribir quedan en `failed`
+    como (directorio del split, nombre de archivo).
+    """
+
+    _COLUMNS = ('file_name', 'text', 'font_name', 'font_category',
+                'font_style', 'source_book', 'mode')
+
+    def __init__(self, rows_per_group=1024, max_pending=256):
+        features = {'image': {'_type': 'Image'}}
+        features.update({name: {'dtype': 'string', '_type': 'Value'} for name in self._COLUMNS})
+        fields = [pa.field('image', pa.struct([('bytes', pa.binary()), ('path', pa.string())]))]
+        fields.extend(pa.field(name, pa.string()) for name in self._COLUMNS)
+        self._schema = pa.schema(fields, metadata={
+            'huggingface': json.dumps({'info': {'features': features}})
+        })
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._rows = defaultdict(list)
+        self._writers = {}
+        self._rows_per_group = rows_per_group
+        self.failed = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, path, metadata_entry, image_bytes):
+        """Encola una muestra (metadata + bytes PNG) para el Parquet `path`"""
+        self._queue.put((Path(path), metadata_entry, image_bytes))
+
+    def _flush(self, path):
+        rows = self._rows.pop(path, None)
+        if not rows:
+            return
+
+        try:
+            self._write_rows(path, rows)
+        except Exception as e:
+            self.failed.extend((path.parent, entry['file_name']) for entry, _ in rows)
+            print(f"\n[ERROR] Writer failed: {e}", file=sys.stderr)
+
+    def _write_rows(self, path, rows):
+        columns = {'image': [{'bytes': data, 'path': entry['file_name']} for entry, data in rows]}
+        for name in self._COLUMNS:
+            columns[name] = [entry[name] for entry, _ in rows]
+        table = pa.table(columns, schema=self._schema)
+
+        writer = self._writers.get(path)
+        if writer is None:
+            writer = pq.ParquetWriter(path, self._schema)
+            self._writers[path] = writer
+        writer.write_table(table)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            path, metadata_entry, image_bytes = item
+            rows = self._rows[path]
+            rows.append((metadata_entry, image_bytes))
+            if len(rows) >= self._rows_per_group:
+                self._flush(path)
+
+        for path in list(self._rows):
+            self._flush(path)
+        for path, writer in self._writers.items():
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"\n[ERROR] Writer failed closing {path}: {e}", file=sys.stderr)
+        self._writers.clear()
+
+    def close(self):
+        """Espera a que se escriban todas las muestras y cierra los archivos"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Estado de cada worker, enviado una sola vez al crear el Pool (ver
+# _init_worker): así cada tarea solo lleva índices y cadenas cortas
+_WORKER_FONTS = ()
+_WORKER_MODE = None
+
+
+def _init_worker(fonts, mode):
+    """
+    Inicializador del Pool: recibe las fuentes una vez por worker
+
+    Args:
+        fonts: tupla de (ruta, nombre, categoría, estilo) por fuente
+        mode: 'words' o 'lines'
+    """
+    global _WORKER_FONTS, _WORKER_MODE
+    _WORKER_FONTS = fonts
+    _WORKER_MODE = mode
+
+
+def _generate_single_image(task, target_height=128, compress_level=1):
     """
     Función worker para generar una imagen (compatible con multiprocessing)
 
     Args:
-        task: dict con {
-            'text': texto a renderizar,
-            'font_path': ruta a la fuente,
-            'split_dir': directorio del split,
-            'img_filename': nombre del archivo de imagen,
-            'text_data': datos del texto (book, etc),
-            'font_info': info de la fuente
-        }
+        task: tupla (font_idx, text, img_filename, split_name, book):
+            índice de la fuente en _WORKER_FONTS, texto a renderizar, nombre
+            del archivo de imagen, split y libro de origen
         target_height: altura de la imagen
+        compress_level: nivel de compresión PNG (0-9)
 
     Returns:
-        dict con metadata o None si falla
+        dict con metadata (más los bytes PNG en 'image_bytes', que el
+        proceso principal escribe a disco). Si falla, solo 'file_name',
+        'split_name' e 'image_bytes' = None, para que el proceso principal
+        pueda descartar también los alias de la tarea
     """
+    font_idx, text, img_filename, split_name, book = task
     try:
-        text = task['text']
-        font_path = task['font_path']
-        split_dir = Path(task['split_dir'])
-        img_filename = task['img_filename']
-
-        # Generar imagen
-        font_size = int(target_height * 0.7)
-        font = ImageFont.truetype(str(font_path), font_size)
-
-        # Medir texto
-        temp_img = Image.new('RGB', (1, 1), 'white')
-        temp_draw = ImageDraw.Draw(temp_img)
-        bbox = temp_draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
-        # Ajustar font_size para alcanzar target_height
-        if text_height > 0:
-            scale_factor = (target_height * 0.8) / text_height
-            font_size = int(font_size * scale_factor)
-            font = ImageFont.truetype(str(font_path), font_size)
-
-            # Volver a medir
-            bbox = temp_draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-        # Crear imagen: altura fija, ancho variable
-        img_width = max(text_width, 10)
-        img_height = target_height
-
-        # Crear imagen RGB
-        img = Image.new('RGB', (img_width, img_height), 'white')
-        draw = ImageDraw.Draw(img)
-
-        # Centrar texto verticalmente
-        y = (target_height - text_height) // 2 - bbox[1]
-        draw.text((0, y), text, font=font, fill='black')
-
-        # Guardar imagen
-        img_path = split_dir / img_filename
-        img.save(img_path)
+        font_path, font_name, font_category, font_style = _WORKER_FONTS[font_idx]
+
+        # Generar imagen y codificarla (la escritura la hace el proceso principal)
+        img = _render_text_image(text, font_path, target_height)
+        image_bytes = _encode_png(img, compress_level)
 
         # Crear metadata
         metadata_entry = {
             'file_name': img_filename,
             'text': text,
-            'font_name': task['font_info']['name'],
-            'font_category': task['font_info']['category'],
-            'font_style': task['font_info']['style'],
-            'source_book': task['text_data']['book'],
-            'mode': task['mode'],
-            'split_name': task['split_name']  # Añadir para poder organizar después
+            'font_name': font_name,
+            'font_category': font_category,
+            'font_style': font_style,
+            'source_book': book,
+            'mode': _WORKER_MODE,
+            'split_name': split_name,  # Añadir para poder organizar después
+            'image_bytes': image_bytes
         }
 
         return metadata_entry
 
     except Exception as e:
         # Retornar None si falla, pero registrar el error
-        import sys
         print(f"\n[ERROR] Worker failed: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc(file=sys.stderr)
-        return None
+        return {'file_name': img_filename, 'split_name': split_name, 'image_bytes': None}
 
 
 class SyntheticDatasetBuilder:
     def __init__(self, data_dir='data', fonts_dir='fonts', output_dir='output',
                  mode='lines', style='normal', verbose=False,
                  train_split=0.8, val_split=0.1, num_workers=1, max_fonts_per_category=None,
-                 category_filter=None):
+                 category_filter=None, output_format='imagefolder', emit_per_sample_labels=False,
+                 dedup_texts=True, png_compress_level=1):
         self.data_dir = Path(data_dir)
         self.fonts_dir = Path(fonts_dir)
         self.output_dir = Path(output_dir)
@@ -121,6 +573,10 @@ class SyntheticDatasetBuilder:
         self.num_workers = num_workers
         self.max_fonts_per_category = max_fonts_per_category  # Límite de fuentes por categoría
         self.category_filter = category_filter  # Filtro de categoría específica
+        self.output_format = output_format  # 'imagefolder' (PNG sueltos), 'tar' (shards) o 'parquet'
+        self.emit_per_sample_labels = emit_per_sample_labels  # JSON por muestra dentro de los shards
+        self.dedup_texts = dedup_texts  # Descartar líneas de texto repetidas al cargar
+        self.png_compress_level = png_compress_level  # Nivel zlib del PNG (0-9)
 
         # Proporciones de splits (train/val/test)
         self.train_split = train_split
@@ -146,7 +602,10 @@ class SyntheticDatasetBuilder:
             'words_generated': 0,
             'train_samples': 0,
             'val_samples': 0,
-            'test_samples': 0
+            'test_samples': 0,
+            'unsupported_skipped': 0,
+            'render_errors': 0,
+            'write_errors': 0
         }
 
         self.fonts = []
@@ -162,77 +621,68 @@ class SyntheticDatasetBuilder:
         # Agrupar fuentes por categoría antes de aplicar límite
         fonts_by_category = defaultdict(list)
 
-        # Recorrer todas las carpetas de fuentes
-        for category_dir in self.fonts_dir.iterdir():
-            if not category_dir.is_dir():
-                continue
+        # Recorrer todas las carpetas de fuentes (os.scandir: el tipo de cada
+        # entrada viene cacheado, sin un stat por entrada ni globs repetidos)
+        with os.scandir(self.fonts_dir) as entries:
+            category_dirs = [entry for entry in entries if entry.is_dir()]
 
+        for category_dir in category_dirs:
             # Aplicar filtro de categoría si está especificado
             if self.category_filter and category_dir.name != self.category_filter:
                 if self.verbose:
                     print(f"  [SKIP] Categoría {category_dir.name} (filtrada)")
                 continue
 
-            for font_dir in category_dir.iterdir():
-                if not font_dir.is_dir():
-                    continue
-
-                # Buscar archivos de fuente en esta carpeta
-                font_files = list(font_dir.glob('*.ttf')) + list(font_dir.glob('*.otf'))
+            with os.scandir(category_dir.path) as entries:
+                font_dirs = [entry for entry in entries if entry.is_dir()]
+
+            for font_dir in font_dirs:
+                # Buscar archivos de fuente en esta carpeta (una sola pasada;
+                # .ttf antes que .otf)
+                ttf_files = []
+                otf_files = []
+                with os.scandir(font_dir.path) as entries:
+                    for entry in entries:
+                        # Como glob('*.ttf'): sin archivos ocultos (p. ej. los
+                        # '._Fuente.ttf' de AppleDouble que deja macOS) ni
+                        # entradas que no sean archivos
+                        if entry.name.startswith('.') or not entry.is_file():
+                            continue
+                        name_lower = entry.name.lower()
+                        if name_lower.endswith('.ttf'):
+                            ttf_files.append(Path(entry.path))
+                        elif name_lower.endswith('.otf'):
+                            otf_files.append(Path(entry.path))
+                font_files = ttf_files + otf_files
 
                 if not font_files:
                     continue
 
-                # Clasificar archivos por estilo
-                normal_fonts = []
-                bold_fonts = []
-
+                # Clasificar archivos por estilo en una sola pasada
+                files_by_style = defaultdict(list)
                 for font_file in font_files:
-                    font_name_lower = font_file.name.lower()
-
-                    # Detectar si es bold
-                    if any(keyword in font_name_lower for keyword in ['bold', 'bd', 'heavy', 'black']):
-                        # Excluir italic-bold si solo queremos bold
-                        if 'italic' not in font_name_lower and 'oblique' not in font_name_lower:
-                            bold_fonts.append(font_file)
-                    # Detectar si es normal (no italic, no bold)
-                    elif not any(keyword in font_name_lower for keyword in ['italic', 'oblique', 'bold', 'bd', 'heavy', 'black']):
-                        normal_fonts.append(font_file)
+                    files_by_style[_classify_font_style(font_file.name)].append(font_file)
 
                 # Determinar si esta fuente tiene bold
-                has_bold = len(bold_fonts) > 0
-
-                if has_bold:
+                if files_by_style.get('bold'):
                     self.stats['fonts_with_bold'] += 1
                 else:
                     self.stats['fonts_without_bold'] += 1
 
                 # Preparar información de fuente según el estilo requerido
                 font_info = None
-                if self.style == 'bold':
-                    if has_bold:
-                        font_info = {
-                            'path': bold_fonts[0],
-                            'name': font_dir.name,
-                            'category': category_dir.name,
-                            'style': 'bold'
-                        }
-                    else:
-                        self.stats['fonts_skipped'] += 1
-                        if self.verbose:
-                            print(f"  [SKIP] {category_dir.name}/{font_dir.name} - Sin bold")
-                elif self.style == 'normal':
-                    if normal_fonts:
-                        font_info = {
-                            'path': normal_fonts[0],
-                            'name': font_dir.name,
-                            'category': category_dir.name,
-                            'style': 'normal'
-                        }
-                    else:
-                        self.stats['fonts_skipped'] += 1
-                        if self.verbose:
-                            print(f"  [SKIP] {category_dir.name}/{font_dir.name} - Sin normal")
+                chosen = files_by_style.get(self.style)
+                if chosen:
+                    font_info = {
+                        'path': chosen[0],
+                        'name': font_dir.name,
+                        'category': category_dir.name,
+                        'style': self.style
+                    }
+                else:
+                    self.stats['fonts_skipped'] += 1
+                    if self.verbose:
+                        print(f"  [SKIP] {category_dir.name}/{font_dir.name} - Sin {self.style}")
 
                 # Agregar a la categoría correspondiente
                 if font_info:
@@ -281,37 +731,61 @@ class SyntheticDatasetBuilder:
         """Carga todos los textos del directorio data"""
         print("\n[2] Cargando textos...")
 
-        for book_dir in self.data_dir.iterdir():
-            if not book_dir.is_dir():
-                continue
+        # Eliminar textos duplicados (misma cadena en varios libros/páginas):
+        # renderizar dos veces la misma cadena con la misma fuente no aporta nada.
+        # Se conserva la primera aparición (y su libro de origen). Se hace
+        # durante la carga para no acumular nunca los duplicados en memoria
+        seen = set() if self.dedup_texts else None
+        duplicates = 0
+        texts = self.texts
+
+        # os.scandir devuelve DirEntry con el tipo ya cacheado: evita un stat
+        # por entrada (Path.iterdir + is_dir + glob)
+        with os.scandir(self.data_dir) as entries:
+            book_entries = [entry for entry in entries if entry.is_dir()]
+
+        txt_files = []  # (libro, DirEntry) en orden de recorrido
+        for book_entry in book_entries:
+            with os.scandir(book_entry.path) as entries:
+                txt_files.extend((book_entry.name, entry) for entry in entries
+                                 if entry.name.endswith('.txt') and entry.is_file())
+
+        # Leer los archivos con un pool de hilos (la lectura es I/O y libera
+        # el GIL). Solo hay unos pocos archivos por delante del que se está
+        # procesando, y se consumen en orden para que la deduplicación
+        # conserve siempre la misma primera aparición
+        max_ahead = _TEXT_READ_WORKERS * 2
+        with ThreadPoolExecutor(max_workers=_TEXT_READ_WORKERS) as executor:
+            pending = deque()
+            files = iter(txt_files)
+
+            for book_name, txt_entry in islice(files, max_ahead):
+                pending.append((book_name, txt_entry, executor.submit(_read_text_chunks, txt_entry.path)))
+
+            while pending:
+                book_name, txt_entry, future = pending.popleft()
+                for next_book, next_entry in islice(files, 1):
+                    pending.append((next_book, next_entry, executor.submit(_read_text_chunks, next_entry.path)))
 
-            for txt_file in book_dir.glob('*.txt'):
                 try:
-                    with open(txt_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    # Dividir en líneas
-                    lines = [line.strip() for line in content.split('\n') if line.strip()]
-
-                    for line in lines:
-                        # Dividir cada línea en grupos de 5 palabras
-                        words = line.split()
-
-                        # Crear líneas de 5 palabras
-                        for i in range(0, len(words), 5):
-                            chunk = words[i:i+5]
-                            if chunk:  # Solo agregar si hay palabras
-                                self.texts.append({
-                                    'text': ' '.join(chunk),
-                                    'book': book_dir.name,
-                                    'file': txt_file.name
-                                })
-
+                    chunks = future.result()
                 except Exception as e:
                     if self.verbose:
-                        print(f"  [ERROR] Error leyendo {txt_file}: {e}")
+                        print(f"  [ERROR] Error leyendo {txt_entry.path}: {e}")
+                    continue
+
+                file_name = txt_entry.name
+                for text in chunks:
+                    if seen is not None:
+                        if text in seen:
+                            duplicates += 1
+                            continue
+                        seen.add(text)
+                    texts.append({'text': text, 'book': book_name, 'file': file_name})
 
         print(f"  [OK] {len(self.texts)} líneas de texto cargadas (5 palabras por línea)")
+        if duplicates:
+            print(f"  [INFO] {duplicates} líneas duplicadas descartadas")
 
     def generate_image(self, text, font_info, target_height=128):
         """
@@ -324,41 +798,7 @@ class SyntheticDatasetBuilder:
             target_height: Altura objetivo en píxeles (default: 128 como IAM)
         """
         try:
-            # Empezar con un tamaño de fuente estimado (70% de la altura objetivo)
-            font_size = int(target_height * 0.7)
-            font = ImageFont.truetype(str(font_info['path']), font_size)
-
-            # Medir texto
-            temp_img = Image.new('RGB', (1, 1), 'white')
-            temp_draw = ImageDraw.Draw(temp_img)
-            bbox = temp_draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-            # Ajustar font_size para alcanzar target_height
-            if text_height > 0:
-                scale_factor = (target_height * 0.8) / text_height
-                font_size = int(font_size * scale_factor)
-                font = ImageFont.truetype(str(font_info['path']), font_size)
-
-                # Volver a medir
-                bbox = temp_draw.textbbox((0, 0), text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-
-            # Crear imagen: altura fija, ancho variable (como IAM)
-            img_width = max(text_width, 10)  # Mínimo 10px de ancho
-            img_height = target_height
-
-            # Crear imagen RGB (como IAM)
-            img = Image.new('RGB', (img_width, img_height), 'white')
-            draw = ImageDraw.Draw(img)
-
-            # Centrar texto verticalmente
-            y = (target_height - text_height) // 2 - bbox[1]
-            draw.text((0, y), text, font=font, fill='black')
-
-            return img
+            return _render_text_image(text, font_info['path'], target_height)
 
         except Exception as e:
             if self.verbose:
@@ -398,11 +838,6 @@ class SyntheticDatasetBuilder:
         val_texts = texts_to_use[train_end:val_end]
         test_texts = texts_to_use[val_end:]
 
-        # Metadata por split (usando JSON Lines format)
-        train_metadata = []
-        val_metadata = []
-        test_metadata = []
-
         # Calcular total de items a procesar
         if self.mode == 'words':
             total_words = sum(len(text_data['text'].split()) for text_data in texts_to_use)
@@ -412,24 +847,37 @@ class SyntheticDatasetBuilder:
 
         print(f"  Total imágenes esperadas: {total_items:,}")
 
-        # Usar multiprocessing si num_workers > 1
-        if self.num_workers > 1:
-            self._generate_dataset_parallel(
-                train_texts, val_texts, test_texts,
-                train_metadata, val_metadata, test_metadata,
-                target_height, total_items
-            )
-        else:
-            self._generate_dataset_sequential(
-                train_texts, val_texts, test_texts,
-                train_metadata, val_metadata, test_metadata,
-                target_height, total_items
-            )
+        # Metadata por split (formato JSON Lines): se escribe en streaming a
+        # medida que se generan las muestras, sin acumularla en memoria
+        metadata_files = {
+            split_name: open(split_dir / 'metadata.jsonl', 'wb', buffering=1 << 20)
+            for split_name, split_dir in [
+                ('train', self.train_dir),
+                ('validation', self.val_dir),
+                ('test', self.test_dir)
+            ]
+        }
 
-        # Guardar metadata.jsonl para cada split (formato JSON Lines)
-        self._save_metadata_jsonl(self.train_dir / 'metadata.jsonl', train_metadata)
-        self._save_metadata_jsonl(self.val_dir / 'metadata.jsonl', val_metadata)
-        self._save_metadata_jsonl(self.test_dir / 'metadata.jsonl', test_metadata)
+        try:
+            # Usar multiprocessing si num_workers > 1
+            if self.num_workers > 1:
+                failed = self._generate_dataset_parallel(
+                    train_texts, val_texts, test_texts,
+                    metadata_files, target_height, total_items
+                )
+            else:
+                failed = self._generate_dataset_sequential(
+                    train_texts, val_texts, test_texts,
+                    metadata_files, target_height, total_items
+                )
+        finally:
+            for metadata_file in metadata_files.values():
+                metadata_file.close()
+
+        # La metadata se escribe en streaming antes de saber si la escritura
+        # en segundo plano terminó bien: quitar las muestras que no llegaron
+        # a disco antes de escribir dataset_info.json
+        self._drop_failed_samples(failed)
 
         # Crear dataset_info.json
         self._create_dataset_info()
@@ -439,16 +887,85 @@ class SyntheticDatasetBuilder:
         print(f"    Validation: {self.stats['val_samples']:,}")
         print(f"    Test: {self.stats['test_samples']:,}")
 
+    def plan_dataset(self, max_texts=None, target_height=128):
+        """
+        Mide el dataset sin generarlo: cuántas imágenes saldrían y de qué ancho
+
+        Solo se calcula la bbox de cada texto con su fuente (sin crear imágenes
+        ni codificar PNG), aplicando los mismos descartes que la generación
+        (caracteres no soportados, textos repetidos por fuente). Útil para
+        estimar tamaño y anchos antes de lanzar una ejecución larga.
+        """
+        print(f"\n[3] Midiendo dataset ({self.mode}, sin generar imágenes)...")
+
+        if not self.fonts or not self.texts:
+            print("  [ERROR] No hay fuentes o textos disponibles")
+            return
+
+        texts_to_use = self.texts[:max_texts] if max_texts else self.texts
+        print(f"  [INFO] Midiendo: {len(texts_to_use)} textos × {len(self.fonts)} fuentes")
+
+        # Histograma de anchos {ancho: imágenes}: hay pocos anchos distintos,
+        # así que ocupa poco aunque se midan millones de textos
+        widths = Counter()
+        skipped = 0
+        reused = 0
+        current_font = None
+
+        for font_info, _, _, text in tqdm(self._iter_render_units([('all', texts_to_use)]),
+                                          desc="Midiendo", unit="img"):
+            if font_info is not current_font:
+                current_font = font_info
+                measured = {}  # texto -> ancho con esta fuente
+                charset = _get_font_charset(font_info['path'])
+
+            if charset is not None and not charset.issuperset(text):
+                skipped += 1
+                continue
+
+            width = measured.get(text)
+            if width is None:
+                _, bbox = _fit_text(text, font_info['path'], target_height)
+                width = measured[text] = max(bbox[2] - bbox[0], 10)  # Mínimo 10px, como al renderizar
+            else:
+                reused += 1
+            widths[width] += 1
+
+        total = sum(widths.values())
+        print(f"  [OK] Imágenes que se generarían: {total:,}")
+        if skipped:
+            print(f"    Saltadas (caracteres no soportados por la fuente): {skipped:,}")
+        if reused:
+            print(f"    Textos repetidos (imagen reutilizada por fuente): {reused:,}")
+        if not total:
+            return
+
+        # Percentiles a partir del histograma
+        percentiles = {}
+        targets = [(name, q * total) for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))]
+        seen = 0
+        for width in sorted(widths):
+            seen += widths[width]
+            while targets and seen >= targets[0][1]:
+                percentiles[targets.pop(0)[0]] = width
+
+        pixels = sum(width * count for width, count in widths.items()) * target_height
+        print(f"    Ancho (px): min {min(widths)}, p50 {percentiles['p50']}, "
+              f"p90 {percentiles['p90']}, p99 {percentiles['p99']}, max {max(widths)}")
+        print(f"    Ancho medio: {pixels / target_height / total:.0f} px")
+        print(f"    Píxeles sin comprimir: {pixels / 1e6:,.1f} MB (8 bits, {target_height}px de alto)")
+
     def _generate_dataset_parallel(self, train_texts, val_texts, test_texts,
-                                    train_metadata, val_metadata, test_metadata,
-                                    target_height, total_items):
+                                    metadata_files, target_height, total_items):
         """
         Genera dataset usando multiprocessing
 
         Thread-safety:
         - NO hay race conditions: nombres de archivo son pre-asignados (únicos)
-        - NO hay conflictos de escritura: cada worker escribe archivos distintos
-        - Metadata se recolecta en proceso principal (thread-safe)
+        - NO hay conflictos de escritura: los workers solo renderizan y codifican;
+          el proceso principal escribe cada archivo (nombre único) con un pool
+          de hilos, solapando el disco con el renderizado
+        - Metadata se escribe solo desde el proceso principal (thread-safe)
 
         Distribución de carga:
         - Todas las tareas se preparan antes (load balancing automático)
@@ -456,220 +973,347 @@ class SyntheticDatasetBuilder:
         - Chunksize calculado dinámicamente para optimizar
         """
 
-        # Preparar todas las tareas (pre-asignar nombres de archivo)
-        # THREAD-SAFE: nombres se calculan ANTES de multiprocessing
-        tasks = []
-        counters = {'train': 0, 'validation': 0, 'test': 0}
-
-        for font_info in self.fonts:
-            for split_name, split_texts, split_dir in [
-                ('train', train_texts, self.train_dir),
-                ('validation', val_texts, self.val_dir),
-                ('test', test_texts, self.test_dir)
-            ]:
-                for text_data in split_texts:
-                    text = text_data['text']
-
-                    # Si modo es 'words', extraer palabras
-                    if self.mode == 'words':
-                        words = text.split()
-                        if not words:
-                            continue
-                        words_to_render = words
-                    else:  # 'lines'
-                        words_to_render = [text]
-
-                    # Para cada palabra/línea
-                    for text_to_render in words_to_render:
-                        # Pre-asignar nombre único (evita race conditions)
-                        img_filename = f"{counters[split_name]:08d}.png"
-                        counters[split_name] += 1
-
-                        # Crear diccionarios serializables (solo strings, no objetos Path)
-                        task = {
-                            'text': text_to_render,
-                            'font_path': str(font_info['path']),
-                            'split_dir': str(split_dir),
-                            'img_filename': img_filename,
-                            'text_data': {
-                                'book': text_data['book'],
-                                'file': text_data.get('file', '')
-                            },
-                            'font_info': {
-                                'name': font_info['name'],
-                                'category': font_info['category'],
-                                'style': font_info['style']
-                            },
-                            'mode': self.mode,
-                            'split_name': split_name
-                        }
-                        tasks.append(task)
+        # Las tareas se generan de forma perezosa (ver _iter_tasks): el Pool
+        # solo tiene en vuelo unos pocos chunks, no la lista completa
+        # Un texto repetido se renderiza una sola vez por fuente: las demás
+        # apariciones se guardan como alias de la tarea que sí lo renderiza
+        # {(split, archivo primario): [(split, archivo, libro), ...]}
+        repeated_texts = self._find_repeated_texts(train_texts + val_texts + test_texts)
+        aliases = {}
+        split_texts = [('train', train_texts), ('validation', val_texts), ('test', test_texts)]
+        tasks = self._iter_tasks(split_texts, repeated_texts, aliases)
 
         # Calcular chunksize óptimo para distribución equitativa
-        # Fórmula: total_tasks / (workers * 4) para buen balance
-        optimal_chunksize = max(1, len(tasks) // (self.num_workers * 4))
+        # Fórmula: total_tasks / (workers * 4) para buen balance, acotado a
+        # [32, 1024] para amortizar el IPC sin perder balance al final ni
+        # granularidad en la barra de progreso. total_items es una cota
+        # superior (no descuenta textos repetidos ni no soportados)
+        optimal_chunksize = total_items // (self.num_workers * 4)
+        optimal_chunksize = max(1, min(max(32, optimal_chunksize), 1024, total_items))
 
         if self.verbose:
-            print(f"  [INFO] Total tareas: {len(tasks):,}")
+            print(f"  [INFO] Total tareas (máx.): {total_items:,}")
             print(f"  [INFO] Chunksize: {optimal_chunksize}")
 
         # Configurar método de inicio según el sistema operativo
-        # Windows requiere 'spawn', Linux/Mac pueden usar 'fork' (más eficiente)
+        # Windows requiere 'spawn'. En Linux/Mac se usa 'forkserver': los
+        # workers no heredan el heap del proceso principal (textos, fuentes,
+        # tareas), que con 'fork' se acaba copiando igualmente al tocar los
+        # contadores de referencias. Solo reciben lo que pasa _init_worker
         if platform.system() == 'Windows':
             ctx = mp.get_context('spawn')
         else:
-            ctx = mp.get_context('fork')
+            ctx = mp.get_context('forkserver')
 
         # Procesar en paralelo con Pool
-        worker_fn = partial(_generate_single_image, target_height=target_height)
-
-        with ctx.Pool(processes=self.num_workers) as pool:
+        worker_fn = partial(_generate_single_image, target_height=target_height,
+                            compress_level=self.png_compress_level)
+        split_dirs = {'train': self.train_dir, 'validation': self.val_dir, 'test': self.test_dir}
+
+        # Las fuentes se envían una sola vez por worker, no en cada tarea
+        worker_fonts = tuple(
+            (str(font_info['path']), font_info['name'], font_info['category'], font_info['style'])
+            for font_info in self.fonts
+        )
+
+        with ctx.Pool(processes=self.num_workers, initializer=_init_worker,
+                      initargs=(worker_fonts, self.mode)) as pool, \
+                self._open_writer() as writer:
             # Usar imap_unordered para mejor rendimiento y load balancing
             # imap_unordered distribuye tareas dinámicamente (no estático)
-            results = []
-
-            # NOTA: tqdm causa deadlocks con multiprocessing en Windows/Linux
-            # Usar contador simple en su lugar
-            print(f"\n  Procesando {len(tasks):,} tareas...")
-            print(f"  Iniciando workers...", flush=True)
-            processed = 0
-            report_interval = max(500, len(tasks) // 200)  # Reportar cada 0.5% o 500 items
-
-            print(f"  Workers iniciados, esperando resultados...", flush=True)
-            for result in pool.imap_unordered(worker_fn, tasks, chunksize=optimal_chunksize):
-                if result is not None:
-                    results.append(result)
-
-                processed += 1
-                if processed % report_interval == 0 or processed == len(tasks):
-                    percent = (processed / len(tasks)) * 100
-                    print(f"  Progreso: {processed:,}/{len(tasks):,} ({percent:.1f}%)", flush=True)
-
-        # Organizar metadata por split (thread-safe, en proceso principal)
-        for result in results:
-            # Remover split_name antes de guardar (no es necesario en metadata final)
-            split_name = result.pop('split_name', 'train')
-
-            if split_name == 'train':
-                train_metadata.append(result)
-            elif split_name == 'validation':
-                val_metadata.append(result)
-            else:
-                test_metadata.append(result)
 
-        # Actualizar estadísticas (solo una vez, después de organizar)
-        self.stats['images_generated'] = len(results)
-        self.stats['train_samples'] = len(train_metadata)
-        self.stats['val_samples'] = len(val_metadata)
-        self.stats['test_samples'] = len(test_metadata)
+            # tqdm solo se actualiza en el proceso principal (los workers no
+            # comparten la barra), así que es seguro con multiprocessing
+            with tqdm(total=total_items, desc="Generando imágenes", unit="img") as pbar:
+                # Los textos no soportados se descuentan en el generador de
+                # tareas; aquí se reflejan en la barra a medida que avanzan
+                skipped_seen = 0
+                for result in pool.imap_unordered(worker_fn, tasks, chunksize=optimal_chunksize):
+                    skipped = self.stats['unsupported_skipped']
+                    pbar.update(skipped - skipped_seen)
+                    skipped_seen = skipped
+
+                    # Remover campos internos antes de guardar la metadata
+                    image_bytes = result.pop('image_bytes')
+                    split_name = result.pop('split_name')
+                    text_aliases = aliases.pop((split_name, result['file_name']), ())
+
+                    if image_bytes is None:
+                        # El render falló: las apariciones repetidas del texto
+                        # tampoco tienen imagen
+                        self.stats['render_errors'] += 1 + len(text_aliases)
+                        pbar.update(1 + len(text_aliases))
+                        continue
+
+                    samples = [(split_name, result)]
+
+                    # Reutilizar la imagen para las apariciones repetidas del texto
+                    for alias_split, alias_filename, alias_book in text_aliases:
+                        samples.append((alias_split, dict(result, file_name=alias_filename, source_book=alias_book)))
+
+                    for sample_split, entry in samples:
+                        self._store_sample(writer, split_dirs[sample_split], entry, image_bytes)
+                        self._record_sample(metadata_files, sample_split, entry)
+                    pbar.update(len(samples))
+
+                pbar.update(self.stats['unsupported_skipped'] - skipped_seen)
+
+        return writer.failed
+
+    def _iter_tasks(self, split_texts, repeated_texts, aliases):
+        """
+        Genera las tareas serializables para los workers, fuente a fuente
+
+        Los nombres de archivo se pre-asignan aquí, en un solo hilo y en orden
+        determinista (evita race conditions). Las tareas de cada fuente se
+        entregan cuando la fuente está completa, de modo que todos los alias de
+        un texto repetido ya están registrados en `aliases` antes de que su
+        tarea primaria llegue a un worker. Así la memoria queda acotada por
+        los textos de una fuente, no por fuentes × textos.
+
+        Args:
+            split_texts: lista de (split_name, textos del split)
+            repeated_texts: textos que aparecen más de una vez
+            aliases: dict a rellenar {(split, archivo primario): [(split, archivo, libro), ...]}
+        """
+        counters = {'train': count(), 'validation': count(), 'test': count()}
+        font_indices = {id(font_info): idx for idx, font_info in enumerate(self.fonts)}
+        font_tasks = []
+        current_font = None
+
+        for font_info, split_name, text_data, text_to_render in self._iter_render_units(split_texts):
+            if font_info is not current_font:
+                # Entregar la fuente anterior (sus alias ya están completos)
+                yield from font_tasks
+                font_tasks = []
+                current_font = font_info
+                primary = {}  # texto -> (split, archivo) de la tarea que lo renderiza
+                font_idx = font_indices[id(font_info)]
+                charset = _get_font_charset(font_info['path'])
+
+            # Saltar textos con caracteres que la fuente no tiene
+            # (se renderizarían como cajas .notdef)
+            if charset is not None and not charset.issuperset(text_to_render):
+                self.stats['unsupported_skipped'] += 1
+                continue
+
+            # Pre-asignar nombre único (evita race conditions)
+            img_filename = f"{next(counters[split_name]):08d}.png"
+
+            if text_to_render in repeated_texts:
+                key = primary.get(text_to_render)
+                if key is not None:
+                    aliases[key].append((split_name, img_filename, text_data['book']))
+                    continue
+                key = (split_name, img_filename)
+                primary[text_to_render] = key
+                aliases[key] = []
+
+            # Tupla compacta: la fuente viaja como índice (ver _init_worker)
+            font_tasks.append((font_idx, text_to_render, img_filename, split_name, text_data['book']))
+
+        yield from font_tasks
+
+    def _generate_dataset_sequential(self, train_texts, val_texts, test_texts,
+                                      metadata_files, target_height, total_items):
+        """
+        Genera dataset secuencialmente (código original)
+
+        dataset_info.json y el resumen los escribe generate_dataset() al
+        terminar, igual que en el modo paralelo
+        """
+
+        # Contadores globales de imágenes (por split)
+        counters = {'train': count(), 'validation': count(), 'test': count()}
+        split_dirs = {'train': self.train_dir, 'validation': self.val_dir, 'test': self.test_dir}
+        split_texts = [('train', train_texts), ('validation', val_texts), ('test', test_texts)]
+
+        # Textos que se repiten: se renderizan una sola vez por fuente
+        repeated_texts = self._find_repeated_texts(train_texts + val_texts + test_texts)
+
+        # Referencias locales para el bucle caliente
+        generate_image = self.generate_image
+        store_sample = self._store_sample
+        record_sample = self._record_sample
+        compress_level = self.png_compress_level
+        mode = self.mode
+        current_font = None
+
+        # La barra se actualiza por lotes: tqdm por elemento pesa cuando el
+        # renderizado es rápido
+        pending_updates = 0
+
+        # Barra de progreso (las escrituras a disco van en segundo plano)
+        with tqdm(total=total_items, desc="Generando imágenes", unit="img") as pbar, \
+                self._open_writer() as writer:
+            # Un solo bucle plano: fuente → split → texto → palabra/línea
+            for font_info, split_name, text_data, text_to_render in self._iter_render_units(split_texts):
+                pending_updates += 1
+                if pending_updates == 256:
+                    pbar.update(pending_updates)
+                    pending_updates = 0
+
+                if font_info is not current_font:
+                    current_font = font_info
+                    rendered = {}  # texto repetido -> PNG ya codificado con esta fuente
+                    charset = _get_font_charset(font_info['path'])
+
+                # Saltar textos con caracteres que la fuente no tiene
+                if charset is not None and not charset.issuperset(text_to_render):
+                    self.stats['unsupported_skipped'] += 1
+                    continue
+
+                # Generar imagen (o reutilizarla si el texto ya se renderizó)
+                image_bytes = rendered.get(text_to_render)
+                if image_bytes is None:
+                    img = generate_image(text_to_render, font_info, target_height)
+
+                    if img is None:
+                        self.stats['render_errors'] += 1
+                        continue
+
+                    image_bytes = _encode_png(img, compress_level)
+                    if text_to_render in repeated_texts:
+                        rendered[text_to_render] = image_bytes
+
+                # Determinar nombre de archivo según el split
+                img_filename = f"{next(counters[split_name]):08d}.png"
+
+                # Crear entrada de metadata (formato HuggingFace)
+                metadata_entry = {
+                    'file_name': img_filename,
+                    'text': text_to_render,
+                    'font_name': font_info['name'],
+                    'font_category': font_info['category'],
+                    'font_style': font_info['style'],
+                    'source_book': text_data['book'],
+                    'mode': mode
+                }
+
+                # Guardar imagen en el split (en segundo plano)
+                store_sample(writer, split_dirs[split_name], metadata_entry, image_bytes)
+                record_sample(metadata_files, split_name, metadata_entry)
+
+            pbar.update(pending_updates)
 
-        # Contar por tipo
+        return writer.failed
+
+    def _iter_render_units(self, split_texts):
+        """
+        Recorre todo lo que hay que renderizar en un solo bucle plano
+
+        Args:
+            split_texts: lista de (split_name, textos del split)
+
+        Yields:
+            (font_info, split_name, text_data, text_to_render) en orden
+            fuente → split → texto → palabra (modo 'words') o línea (modo 'lines')
+        """
+        words_mode = self.mode == 'words'
+        for font_info in self.fonts:
+            for split_name, texts in split_texts:
+                for text_data in texts:
+                    text = text_data['text']
+                    for text_to_render in (text.split() if words_mode else (text,)):
+                        yield font_info, split_name, text_data, text_to_render
+
+    def _find_repeated_texts(self, texts):
+        """Devuelve el conjunto de textos a renderizar que aparecen más de una vez"""
         if self.mode == 'words':
-            self.stats['words_generated'] = self.stats['images_generated']
+            counts = Counter(word for text_data in texts for word in text_data['text'].split())
+        else:
+            counts = Counter(text_data['text'] for text_data in texts)
+        return {text for text, count in counts.items() if count > 1}
+
+    def _open_writer(self):
+        """Crea el writer de imágenes según el formato de salida"""
+        if self.output_format == 'tar':
+            return _ShardWriter()
+        if self.output_format == 'parquet':
+            return _ParquetWriter()
+        return _ImageWriter()
+
+    def _store_sample(self, writer, split_dir, metadata_entry, image_bytes):
+        """
+        Envía una muestra al writer
+
+        En formato 'imagefolder' la imagen va a split_dir/file_name. En formato
+        'tar' la imagen va al shard de su fuente dentro del split, y se añade
+        'shard' a la metadata para poder localizarla. El JSON por muestra dentro
+        del shard es redundante con metadata.jsonl, así que solo se escribe con
+        emit_per_sample_labels. En formato 'parquet' la imagen y su metadata
+        van como una fila del data.parquet del split.
+        """
+        if self.output_format == 'parquet':
+            writer.submit(split_dir / 'data.parquet', metadata_entry, image_bytes)
+        elif self.output_format == 'tar':
+            members = [(metadata_entry['file_name'], image_bytes)]
+            if self.emit_per_sample_labels:
+                key = Path(metadata_entry['file_name']).stem
+                label = _dumps_json(metadata_entry)
+                members.append((f"{key}.json", label))
+
+            shard_name = f"{metadata_entry['font_category']}_{metadata_entry['font_name']}.tar"
+            metadata_entry['shard'] = shard_name
+            writer.submit(split_dir / shard_name, members)
         else:
-            self.stats['lines_generated'] = self.stats['images_generated']
+            writer.submit(split_dir / metadata_entry['file_name'], image_bytes)
 
-    def _generate_dataset_sequential(self, train_texts, val_texts, test_texts,
-                                      train_metadata, val_metadata, test_metadata,
-                                      target_height, total_items):
-        """Genera dataset secuencialmente (código original)"""
-
-        # Contadores globales de imágenes
-        global_train_count = 0
-        global_val_count = 0
-        global_test_count = 0
-
-        # Barra de progreso
-        with tqdm(total=total_items, desc="Generando imágenes", unit="img") as pbar:
-            # Iterar sobre todas las fuentes
-            for font_info in self.fonts:
-                # Procesar cada split
-                for split_name, split_texts, split_dir, split_metadata in [
-                    ('train', train_texts, self.train_dir, train_metadata),
-                    ('validation', val_texts, self.val_dir, val_metadata),
-                    ('test', test_texts, self.test_dir, test_metadata)
-                ]:
-                    # Iterar sobre todos los textos del split
-                    for text_idx, text_data in enumerate(split_texts):
-                        text = text_data['text']
-
-                        # Si modo es 'words', extraer palabras
-                        if self.mode == 'words':
-                            words = text.split()
-                            if not words:
-                                continue
-                            words_to_render = words
-                        else:  # 'lines'
-                            words_to_render = [text]
-
-                        # Para cada palabra/línea
-                        for text_to_render in words_to_render:
-                            # Generar imagen
-                            img = self.generate_image(text_to_render, font_info, target_height)
-
-                            if img is None:
-                                pbar.update(1)
-                                continue
-
-                            # Determinar nombre de archivo según el split
-                            if split_name == 'train':
-                                img_filename = f"{global_train_count:08d}.png"
-                                global_train_count += 1
-                                self.stats['train_samples'] += 1
-                            elif split_name == 'validation':
-                                img_filename = f"{global_val_count:08d}.png"
-                                global_val_count += 1
-                                self.stats['val_samples'] += 1
-                            else:  # test
-                                img_filename = f"{global_test_count:08d}.png"
-                                global_test_count += 1
-                                self.stats['test_samples'] += 1
-
-                            # Guardar imagen en carpeta de split
-                            img_path = split_dir / img_filename
-                            img.save(img_path)
-
-                            # Crear entrada de metadata (formato HuggingFace)
-                            metadata_entry = {
-                                'file_name': img_filename,
-                                'text': text_to_render,
-                                'font_name': font_info['name'],
-                                'font_category': font_info['category'],
-                                'font_style': font_info['style'],
-                                'source_book': text_data['book'],
-                                'mode': self.mode
-                            }
-
-                            split_metadata.append(metadata_entry)
-
-                            self.stats['images_generated'] += 1
-
-                            if self.mode == 'words':
-                                self.stats['words_generated'] += 1
-                            else:
-                                self.stats['lines_generated'] += 1
-
-                            # Actualizar barra de progreso
-                            pbar.update(1)
-
-        # Guardar metadata.jsonl para cada split (formato JSON Lines)
-        self._save_metadata_jsonl(self.train_dir / 'metadata.jsonl', train_metadata)
-        self._save_metadata_jsonl(self.val_dir / 'metadata.jsonl', val_metadata)
-        self._save_metadata_jsonl(self.test_dir / 'metadata.jsonl', test_metadata)
+    def _record_sample(self, metadata_files, split_name, metadata_entry):
+        """Añade una entrada al metadata.jsonl de su split y actualiza estadísticas"""
+        metadata_files[split_name].write(_dumps_json(metadata_entry) + b'\n')
 
-        # Crear dataset_info.json
-        self._create_dataset_info()
+        self.stats['images_generated'] += 1
+        self.stats[_SPLIT_STATS[split_name]] += 1
 
-        print(f"  [OK] {self.stats['images_generated']:,} imágenes generadas")
-        print(f"    Train: {self.stats['train_samples']:,}")
-        print(f"    Validation: {self.stats['val_samples']:,}")
-        print(f"    Test: {self.stats['test_samples']:,}")
+        if self.mode == 'words':
+            self.stats['words_generated'] += 1
+        else:
+            self.stats['lines_generated'] += 1
+
+    def _drop_failed_samples(self, failed):
+        """
+        Quita de metadata.jsonl y de las estadísticas las muestras cuya
+        escritura falló, para que el dataset solo liste lo que está en disco
 
-    def _save_metadata_jsonl(self, filepath, metadata_list):
-        """Guarda metadata en formato JSON Lines (una línea por entrada)"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            for entry in metadata_list:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        Args:
+            failed: [(directorio del split, nombre de archivo), ...] del writer
+        """
+        if not failed:
+            return
+
+        failed_by_dir = defaultdict(set)
+        for split_dir, file_name in failed:
+            failed_by_dir[Path(split_dir)].add(file_name)
+
+        split_names = {self.train_dir: 'train', self.val_dir: 'validation', self.test_dir: 'test'}
+        mode_stat = 'words_generated' if self.mode == 'words' else 'lines_generated'
+
+        for split_dir, file_names in failed_by_dir.items():
+            split_name = split_names.get(split_dir)
+            if split_name is None:
+                continue
+
+            # Reescribir el metadata.jsonl del split sin esas filas (solo
+            # ocurre si hubo errores, así que no cuesta nada en el caso normal)
+            metadata_path = split_dir / 'metadata.jsonl'
+            tmp_path = split_dir / 'metadata.jsonl.tmp'
+            dropped = 0
+            with open(metadata_path, 'rb') as src, open(tmp_path, 'wb', buffering=1 << 20) as dst:
+                for line in src:
+                    if json.loads(line)['file_name'] in file_names:
+                        dropped += 1
+                    else:
+                        dst.write(line)
+            os.replace(tmp_path, metadata_path)
+
+            self.stats['images_generated'] -= dropped
+            self.stats[_SPLIT_STATS[split_name]] -= dropped
+            self.stats[mode_stat] -= dropped
+            self.stats['write_errors'] += dropped
+
+        print(f"  [ERROR] {self.stats['write_errors']:,} imágenes no se pudieron escribir "
+              f"(quitadas de metadata.jsonl)")
 
     def _create_dataset_info(self):
         """Crea el archivo dataset_info.json con información del dataset"""
@@ -701,10 +1345,14 @@ class SyntheticDatasetBuilder:
             },
             'mode': self.mode,
             'style': self.style,
+            'output_format': self.output_format,
             'total_samples': self.stats['images_generated'],
             'num_fonts': len(self.fonts)
         }
 
+        if self.output_format == 'tar':
+            dataset_info['features']['shard'] = {'dtype': 'string'}
+
         dataset_info_path = self.output_dir / 'dataset_info.json'
         with open(dataset_info_path, 'w', encoding='utf-8') as f:
             json.dump(dataset_info, f, ensure_ascii=False, indent=2)
@@ -730,21 +1378,31 @@ class SyntheticDatasetBuilder:
             print(f"  Palabras: {self.stats['words_generated']:,}")
         else:
             print(f"  Líneas: {self.stats['lines_generated']:,}")
+        if self.stats['unsupported_skipped']:
+            print(f"  Saltadas (caracteres no soportados por la fuente): {self.stats['unsupported_skipped']:,}")
+        if self.stats['render_errors']:
+            print(f"  Errores de renderizado (no incluidas): {self.stats['render_errors']:,}")
+        if self.stats['write_errors']:
+            print(f"  Errores de escritura (no incluidas): {self.stats['write_errors']:,}")
         print(f"\nSplits:")
         print(f"  Train: {self.stats['train_samples']:,} ({self.train_split:.0%})")
         print(f"  Validation: {self.stats['val_samples']:,} ({self.val_split:.0%})")
         print(f"  Test: {self.stats['test_samples']:,} ({self.test_split:.0%})")
+        samples_desc = {
+            'tar': "[shards .tar por fuente]",
+            'parquet': "data.parquet"
+        }.get(self.output_format, "[imágenes .png]")
         print(f"\nEstructura del dataset:")
         print(f"  {self.output_dir.absolute()}/")
         print(f"    ├── train/")
         print(f"    │   ├── metadata.jsonl")
-        print(f"    │   └── [imágenes .png]")
+        print(f"    │   └── {samples_desc}")
         print(f"    ├── validation/")
         print(f"    │   ├── metadata.jsonl")
-        print(f"    │   └── [imágenes .png]")
+        print(f"    │   └── {samples_desc}")
         print(f"    ├── test/")
         print(f"    │   ├── metadata.jsonl")
-        print(f"    │   └── [imágenes .png]")
+        print(f"    │   └── {samples_desc}")
         print(f"    └── dataset_info.json")
         print()
 
@@ -768,17 +1426,35 @@ def main():
                         help='Número máximo de textos a usar (default: todos)')
     parser.add_argument('--font-size', type=int, default=128,
                         help='Altura de imagen en píxeles (default: 128, compatible con IAM/TrOCR)')
+    parser.add_argument('--png-compress', type=int, choices=range(10), default=1, metavar='0-9',
+                        help='Nivel de compresión PNG (default: 1). Niveles altos apenas reducen '
+                             'el tamaño con texto negro sobre blanco y cuestan mucha más CPU')
     parser.add_argument('--workers', '-j', type=int, default=1,
                         help='Número de workers paralelos (default: 1). Usa -1 para todos los cores')
     parser.add_argument('--max-fonts-per-category', type=int, default=None,
                         help='Número máximo de fuentes por categoría (default: todas)')
     parser.add_argument('--category-filter', type=str, default=None,
                         help='Filtrar por categoría específica (ej: Handwritten, Brush, Script)')
+    parser.add_argument('--keep-duplicate-texts', action='store_true',
+                        help='No descartar líneas de texto repetidas en el corpus (default: se descartan)')
+    parser.add_argument('--output-format', choices=['imagefolder', 'tar', 'parquet'], default='imagefolder',
+                        help='Formato de salida: imagefolder (un PNG por muestra), tar '
+                             '(un shard .tar por fuente y split) o parquet (un data.parquet por '
+                             'split, requiere pyarrow) (default: imagefolder)')
+    parser.add_argument('--emit-per-sample-labels', action='store_true',
+                        help='Con --output-format tar, añadir un .json por muestra dentro del shard '
+                             '(redundante con metadata.jsonl)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Solo medir: muestra cuántas imágenes se generarían y sus anchos, '
+                             'sin renderizar ni escribir imágenes')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Mostrar información detallada')
 
     args = parser.parse_args()
 
+    if args.output_format == 'parquet' and pa is None:
+        parser.error("--output-format parquet requiere pyarrow (pip install pyarrow)")
+
     # Determinar número de workers
     num_workers = args.workers
     if num_workers == -1:
@@ -813,6 +1489,10 @@ def main():
         num_workers=num_workers,
         max_fonts_per_category=args.max_fonts_per_category,
         category_filter=args.category_filter,
+        output_format=args.output_format,
+        emit_per_sample_labels=args.emit_per_sample_labels,
+        dedup_texts=not args.keep_duplicate_texts,
+        png_compress_level=args.png_compress,
         verbose=args.verbose
     )
 
@@ -822,6 +1502,10 @@ def main():
     # Cargar textos
     builder.load_texts()
 
+    if args.dry_run:
+        builder.plan_dataset(max_texts=args.max_texts, target_height=args.font_size)
+        return
+
     # Generar dataset
     builder.generate_dataset(
         max_texts=args.max_texts,
@@ -831,6 +1515,11 @@ def main():
     # Resumen
     builder.generate_summary()
 
+    if builder.stats['write_errors']:
+        print(f"[ERROR] {builder.stats['write_errors']:,} imágenes no se pudieron escribir "
+              f"(ver los errores más arriba)")
+        sys.exit(1)
+
     print("[SUCCESS] Dataset generado correctamente!")
 
 if __name__ == "__main__":
@@ -8,80 +8,95 @@ import csv
 import requests
 import os
 import sys
-import time
 import argparse
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import re
 import zipfile
-import io
-
-def sanitize_filename(filename):
-    """Sanitiza el nombre del archivo eliminando caracteres inválidos"""
-    # Reemplazar caracteres inválidos en Windows/Linux
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Eliminar espacios múltiples
-    filename = re.sub(r'\s+', '_', filename)
-    # Limitar longitud
-    if len(filename) > 200:
-        filename = filename[:200]
-    return filename
-
-def download_font(download_url, font_folder, font_name):
-    """Descarga una fuente, la descomprime y guarda los archivos en una carpeta"""
-
-    headers = {
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from scrape_utils import RateLimiter, sanitize_filename
+
+def create_session(pool_size=8):
+    """Crea una sesión HTTP compartida entre hilos (reutiliza conexiones TCP/TLS)"""
+    session = requests.Session()
+    session.headers.update({
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
-
+    })
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=3, backoff_factor=0.5,
+                                            status_forcelist=(429, 500, 502, 503, 504)))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def download_font(session, download_url, font_folder, font_name, rate_limiter=None):
+    """
+    Descarga una fuente, la descomprime y guarda los archivos en una carpeta
+
+    Returns:
+        (éxito, mensaje): no imprime nada, para poder llamarse desde varios hilos
+    """
     try:
-        print(f"  Descargando: {font_name}...", end=' ')
-        response = requests.get(download_url, headers=headers, timeout=30)
-        response.raise_for_status()
-
-        file_size = len(response.content) / 1024  # KB
-
-        # Verificar si es un ZIP
-        if response.content[:2] == b'PK':  # ZIP file magic number
-            try:
-                # Descomprimir el ZIP
-                with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-                    # Extraer todos los archivos a la carpeta de la fuente
-                    zf.extractall(font_folder)
-                    num_files = len(zf.namelist())
-                    print(f"[OK] ({file_size:.1f} KB, {num_files} archivos extraídos)")
-                    return True
-            except zipfile.BadZipFile:
-                print(f"[ERROR] Archivo ZIP corrupto")
-                return False
-        else:
-            # Si no es ZIP, guardar el archivo directamente (TTF/OTF)
-            # Intentar determinar la extensión
-            if b'OTTO' in response.content[:4]:
-                ext = '.otf'
-            elif b'\x00\x01\x00\x00' in response.content[:4] or b'true' in response.content[:4]:
-                ext = '.ttf'
+        if rate_limiter is not None:
+            rate_limiter.wait()
+
+        # Volcar la respuesta por bloques a un archivo temporal (en memoria
+        # hasta 8 MB, en disco a partir de ahí): no se retiene el archivo
+        # entero en RAM dos veces (response.content + BytesIO)
+        with session.get(download_url, timeout=30, stream=True) as response, \
+                tempfile.SpooledTemporaryFile(max_size=8 << 20) as tmp:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=65536):
+                tmp.write(chunk)
+
+            file_size = tmp.tell() / 1024  # KB
+            tmp.seek(0)
+            magic = tmp.read(4)
+            tmp.seek(0)
+
+            # Verificar si es un ZIP
+            if magic[:2] == b'PK':  # ZIP file magic number
+                try:
+                    # Descomprimir el ZIP
+                    with zipfile.ZipFile(tmp) as zf:
+                        # Extraer todos los archivos a la carpeta de la fuente
+                        # (se crea solo ahora que el contenido es válido)
+                        font_folder.mkdir(parents=True, exist_ok=True)
+                        zf.extractall(font_folder)
+                        num_files = len(zf.namelist())
+                        return True, f"[OK] ({file_size:.1f} KB, {num_files} archivos extraídos)"
+                except zipfile.BadZipFile:
+                    return False, "[ERROR] Archivo ZIP corrupto"
             else:
-                ext = '.font'  # Extensión genérica
-
-            output_file = font_folder / f"{font_name}{ext}"
-            with open(output_file, 'wb') as f:
-                f.write(response.content)
-
-            print(f"[OK] ({file_size:.1f} KB, archivo directo)")
-            return True
+                # Si no es ZIP, guardar el archivo directamente (TTF/OTF)
+                # Intentar determinar la extensión
+                if b'OTTO' in magic:
+                    ext = '.otf'
+                elif b'\x00\x01\x00\x00' in magic or b'true' in magic:
+                    ext = '.ttf'
+                else:
+                    ext = '.font'  # Extensión genérica
+
+                font_folder.mkdir(parents=True, exist_ok=True)
+                output_file = font_folder / f"{font_name}{ext}"
+                with open(output_file, 'wb') as f:
+                    shutil.copyfileobj(tmp, f, 65536)
+
+                return True, f"[OK] ({file_size:.1f} KB, archivo directo)"
 
     except requests.exceptions.RequestException as e:
-        print(f"[ERROR] {e}")
-        return False
+        return False, f"[ERROR] {e}"
     except Exception as e:
-        print(f"[ERROR] {e}")
-        return False
+        return False, f"[ERROR] {e}"
 
 def main():
     parser = argparse.ArgumentParser(description='Descargar fuentes Catalanas y organizarlas por categoría')
     parser.add_argument('csv_file', help='Archivo CSV con las fuentes a descargar')
     parser.add_argument('--output-dir', default='fonts', help='Directorio base para guardar las fuentes (default: fonts)')
-    parser.add_argument('--delay', type=float, default=1.0, help='Delay en segundos entre descargas (default: 1.0)')
+    parser.add_argument('--delay', type=float, default=1.0, help='Intervalo mínimo en segundos entre el inicio de dos descargas (default: 1.0)')
+    parser.add_argument('--workers', type=int, default=8, help='Descargas simultáneas (default: 8)')
     parser.add_argument('--skip-existing', action='store_true', help='Saltar fuentes que ya existen')
 
     args = parser.parse_args()
@@ -101,6 +116,7 @@ def main():
     print(f"CSV: {args.csv_file}")
     print(f"Directorio destino: {args.output_dir}")
     print(f"Delay entre descargas: {args.delay}s")
+    print(f"Descargas simultáneas: {args.workers}")
     print("=" * 60)
     print()
 
@@ -123,11 +139,11 @@ def main():
     print(f"Categorías: {', '.join(sorted(categories))}")
     print()
 
-    # Crear carpetas para cada categoría
-    for category in categories:
-        category_dir = base_dir / category
-        category_dir.mkdir(exist_ok=True)
-        print(f"[OK] Carpeta creada/verificada: {category_dir}")
+    # Crear carpetas para cada categoría (las de cada fuente se crean al
+    # terminar su descarga)
+    for category in sorted(categories):
+        (base_dir / category).mkdir(exist_ok=True)
+    print(f"[OK] {len(categories)} carpeta(s) de categoría creadas/verificadas en {base_dir}")
 
     print()
     print("Iniciando descarga...")
@@ -140,15 +156,13 @@ def main():
         'failed': 0
     }
 
-    # Descargar cada fuente
-    for i, font in enumerate(fonts_to_download, 1):
+    # Preparar descargas (saltando las que ya existen)
+    pending = []
+    for font in fonts_to_download:
         font_name = font['name']
         category = font['category']
-        download_url = font['download_url']
 
-        print(f"\n[{i}/{len(fonts_to_download)}] {category} / {font_name}")
-
-        # Sanitizar nombre y crear carpeta para la fuente
+        # Sanitizar nombre
         safe_name = sanitize_filename(font_name)
         font_folder = base_dir / category / safe_name
 
@@ -158,26 +172,41 @@ def main():
             stats['skipped'] += 1
             continue
 
-        # Crear carpeta para la fuente
-        font_folder.mkdir(parents=True, exist_ok=True)
-
-        # Descargar y extraer
-        success = download_font(download_url, font_folder, font_name)
-
-        if success:
-            stats['downloaded'] += 1
-        else:
-            stats['failed'] += 1
-            # Si falla, eliminar la carpeta vacía
-            try:
-                if font_folder.exists() and not any(font_folder.iterdir()):
-                    font_folder.rmdir()
-            except:
-                pass
-
-        # Delay entre descargas para ser respetuosos con el servidor
-        if i < len(fonts_to_download):
-            time.sleep(args.delay)
+        pending.append((font, font_folder))
+
+    # Descargar en paralelo: la espera de red de cada descarga se solapa con
+    # las demás. El rate limiter mantiene el intervalo mínimo entre peticiones
+    # para ser respetuosos con el servidor
+    workers = max(1, args.workers)
+    session = create_session(pool_size=workers)
+    rate_limiter = RateLimiter(args.delay)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(download_font, session, font['download_url'],
+                            font_folder, font['name'], rate_limiter): (font, font_folder)
+            for font, font_folder in pending
+        }
+
+        for i, future in enumerate(as_completed(futures), 1):
+            font, font_folder = futures[future]
+            success, message = future.result()
+            print(f"[{i}/{len(pending)}] {font['category']} / {font['name']}: {message}")
+
+            if success:
+                stats['downloaded'] += 1
+            else:
+                stats['failed'] += 1
+                # Si falla tras crear la carpeta, eliminarla si quedó vacía
+                try:
+                    with os.scandir(font_folder) as it:
+                        empty = next(it, None) is None
+                    if empty:
+                        font_folder.rmdir()
+                except:
+                    pass
+
+    session.close()
 
     # Resultados finales
     print()
@@ -194,7 +223,9 @@ def main():
     print("Resumen por categoría:")
     for category in sorted(categories):
         category_dir = base_dir / category
-        num_fonts = len([d for d in category_dir.iterdir() if d.is_dir()])
+        # DirEntry.is_dir() usa el tipo que ya devuelve el listado, sin stat()
+        with os.scandir(category_dir) as it:
+            num_fonts = sum(1 for entry in it if entry.is_dir())
         print(f"  {category}: {num_fonts} fuente(s)")
 
     print()
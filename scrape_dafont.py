@@ -5,17 +5,61 @@ Finds fonts that support Catalan special characters, particularly l·l
 """
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import csv
 from urllib.parse import urljoin
 import argparse
+import hashlib
 import io
+import os
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from fontTools.ttLib import TTFont
 
+try:
+    import lxml  # noqa: F401  (optional C parser, much faster than html.parser)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Only build the parts of each page we actually look at
+FONT_LIST_STRAINER = SoupStrainer('div')
+LINK_STRAINER = SoupStrainer('a', href=True)
+
 class DaFontScraper:
-    def __init__(self, use_accent_filter=True, verbose=False):
+    # Catalan-specific characters, numbers, and punctuation every accepted
+    # font must map, with the names used in the verbose report
+    CATALAN_CHARS = {
+        0x00B7: ('middle dot', '·'),
+        0x00E7: ('c with cedilla', 'ç'),
+        0x0030: ('0 (zero)', '0'),
+        0x0031: ('1 (one)', '1'),
+        0x0032: ('2 (two)', '2'),
+        0x0033: ('3 (three)', '3'),
+        0x0034: ('4 (four)', '4'),
+        0x0035: ('5 (five)', '5'),
+        0x0036: ('6 (six)', '6'),
+        0x0037: ('7 (seven)', '7'),
+        0x0038: ('8 (eight)', '8'),
+        0x0039: ('9 (nine)', '9'),
+        0x002D: ('hyphen-minus', '-'),
+        0x003C: ('less than', '<'),
+        0x003E: ('greater than', '>'),
+        0x0028: ('left parenthesis', '('),
+        0x0029: ('right parenthesis', ')'),
+    }
+    REQUIRED_CODEPOINTS = frozenset(CATALAN_CHARS)
+    # DaFont themes whose fonts are pictures rather than Latin text: rejected
+    # from the listing alone, without fetching the detail page or the font
+    SKIP_TAGS = frozenset(['Dingbats'])
+
+    def __init__(self, use_accent_filter=True, verbose=False, concurrency=4,
+                 cache_dir=None, cache_ttl=24 * 3600):
         self.base_url = "https://www.dafont.com"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -25,20 +69,96 @@ class DaFontScraper:
         self.verbose = verbose
         # DaFont filter parameters
         self.filter_params = "&a=on" if use_accent_filter else ""
+        # Font detail pages and font downloads in flight at once
+        self.concurrency = max(1, concurrency)
+        # One keep-alive session for every request (no new TCP/TLS handshake
+        # per page or font), with a connection pool as large as the workers
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency,
+                              max_retries=Retry(total=3, backoff_factor=0.5,
+                                                status_forcelist=(429, 500, 502, 503, 504)))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # In-run memo of detail pages and font checks, keyed by URL
+        self._details_cache = {}
+        self._support_cache = {}
+        # Optional on-disk cache of pages and font files, keyed by URL
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_ttl = cache_ttl
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Per-thread log buffer (see _log) and lock to print whole buffers
+        self._local = threading.local()
+        self._print_lock = threading.Lock()
+
+    def _log(self, message):
+        """
+        Print a message, or buffer it while a font is being checked in a
+        worker thread so the lines of concurrent fonts don't interleave
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            print(message)
+        else:
+            buffer.append(message)
+
+    def _cache_path(self, url, suffix):
+        """Cache file for a URL, or None when caching is disabled"""
+        if not self.cache_dir:
+            return None
+        return self.cache_dir / (hashlib.sha1(url.encode('utf-8')).hexdigest() + suffix)
+
+    def _read_cache(self, cache_path):
+        """Return the cached bytes if the entry exists and is fresh, else None"""
+        if cache_path is None:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime < self.cache_ttl:
+                return cache_path.read_bytes()
+        except OSError:
+            pass
+        return None
+
+    def _write_cache(self, cache_path, data):
+        """
+        Store bytes atomically (concurrent runs never see a partial file).
+        Write errors are reported and otherwise ignored
+        """
+        if cache_path is None:
+            return
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            # The cache is only an optimisation: a full disk or a read-only
+            # cache directory must not abort the scrape
+            self._log(f"[WARNING] Could not write cache file {cache_path}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
 
     def get_page(self, url):
         """Fetch a page with error handling"""
+        cache_path = self._cache_path(url, '.html')
+        cached = self._read_cache(cache_path)
+        if cached is not None:
+            return cached.decode('utf-8')
+
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
+            self._write_cache(cache_path, response.text.encode('utf-8'))
             return response.text
         except requests.exceptions.ProxyError as e:
-            print(f"❌ Network Error: DaFont appears to be blocked by your network/proxy")
-            print(f"   You may need to run this script from a different network")
-            print(f"   Error: {e}")
+            self._log(f"❌ Network Error: DaFont appears to be blocked by your network/proxy")
+            self._log(f"   You may need to run this script from a different network")
+            self._log(f"   Error: {e}")
             return None
         except requests.RequestException as e:
-            print(f"❌ Error fetching {url}: {e}")
+            self._log(f"❌ Error fetching {url}: {e}")
             return None
 
     def get_font_categories(self):
@@ -99,7 +219,7 @@ class DaFontScraper:
             if not html:
                 break
 
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = BeautifulSoup(html, HTML_PARSER, parse_only=FONT_LIST_STRAINER)
 
             # Find font entries
             font_divs = soup.find_all('div', class_='lv1left')
@@ -107,14 +227,30 @@ class DaFontScraper:
                 # Try alternative structure
                 font_divs = soup.find_all('div', style=lambda x: x and 'font-size' in x)
 
+            font_entries = []
+            skip_tags = []
             for font_div in font_divs:
                 font_link = font_div.find('a', href=True)
                 if font_link:
                     font_name = font_link.get_text(strip=True)
                     font_url = urljoin(self.base_url, font_link['href'])
-
-                    # Get font details page
-                    font_info = self.get_font_details(font_url)
+                    font_entries.append((font_name, font_url))
+                    skip_tags.append(self._skip_tag(font_div))
+
+            # Detail pages and font downloads are network-bound: fetch several
+            # fonts at once (results keep the page order). Fonts from a
+            # SKIP_TAGS theme are rejected without touching the network
+            to_check = [entry for entry, tag in zip(font_entries, skip_tags) if not tag]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                checked = executor.map(self._get_font_details_buffered, to_check)
+                for (font_name, font_url), skip_tag in zip(font_entries, skip_tags):
+                    if skip_tag:
+                        if self.verbose:
+                            with self._print_lock:
+                                print(f"    {font_name}: [SKIP] {skip_tag} font, not downloaded")
+                        font_info = {'supports_catalan': False, 'download_url': None}
+                    else:
+                        font_info = next(checked)
                     if font_info:
                         font_info['name'] = font_name
                         font_info['url'] = font_url
@@ -125,13 +261,44 @@ class DaFontScraper:
 
         return fonts
 
+    def _skip_tag(self, font_div):
+        """Return the SKIP_TAGS theme a listed font belongs to, or None"""
+        # The theme trail ("Dingbats > Various") sits in the next div
+        theme_div = font_div.find_next_sibling('div')
+        if theme_div is None or 'lv1right' not in theme_div.get('class', []):
+            return None
+        for link in theme_div.find_all('a'):
+            tag = link.get_text(strip=True)
+            if tag in self.SKIP_TAGS:
+                return tag
+        return None
+
+    def _get_font_details_buffered(self, font_entry):
+        """Run get_font_details in a worker thread, printing its log in one block"""
+        font_name, font_url = font_entry
+        self._local.buffer = []
+        try:
+            return self.get_font_details(font_url)
+        finally:
+            buffer, self._local.buffer = self._local.buffer, None
+            if buffer:
+                with self._print_lock:
+                    print(f"    {font_name}:")
+                    print("\n".join(buffer))
+
     def get_font_details(self, font_url):
         """Get detailed information about a font"""
+        # DaFont lists the same font in several categories: reuse the result
+        cached = self._details_cache.get(font_url)
+        if cached is not None:
+            return dict(cached)
+
         html = self.get_page(font_url)
         if not html:
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        # Only the links matter here: skip building the rest of the tree
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=LINK_STRAINER)
         info = {
             'supports_catalan': False,
             'download_url': None
@@ -148,6 +315,7 @@ class DaFontScraper:
             catalan_support = self.check_character_support(info['download_url'])
             info['supports_catalan'] = catalan_support
 
+        self._details_cache[font_url] = dict(info)
         return info
 
     def check_character_support(self, download_url):
@@ -160,34 +328,52 @@ class DaFontScraper:
         - U+002D (hyphen -)
         - U+003C and U+003E (< >)
         - U+0028 and U+0029 (parentheses)
+
+        Results are memoized by download URL for the rest of the run.
         """
         if not download_url:
             if self.verbose:
-                print("      [X] No download URL available")
+                self._log("      [X] No download URL available")
             return False
 
-        # Download the font file
-        try:
-            response = requests.get(download_url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-        except Exception as e:
-            if self.verbose:
-                print(f"      [X] Failed to download font: {e}")
-            return False
+        supported = self._support_cache.get(download_url)
+        if supported is None:
+            supported = self._inspect_font(download_url)
+            self._support_cache[download_url] = supported
+        elif self.verbose:
+            self._log(f"      [CACHED] {'ACCEPT' if supported else 'REJECT'} (already checked in this run)")
+        return supported
+
+    def _inspect_font(self, download_url):
+        """Download a font file and check its cmap (see check_character_support)"""
+
+        # Download the font file (or reuse it from the cache)
+        cache_path = self._cache_path(download_url, '.bin')
+        content = self._read_cache(cache_path)
+        if content is None:
+            try:
+                response = self.session.get(download_url, timeout=30)
+                response.raise_for_status()
+            except Exception as e:
+                if self.verbose:
+                    self._log(f"      [X] Failed to download font: {e}")
+                return False
+            content = response.content
+            self._write_cache(cache_path, content)
 
         # Extract font file from ZIP if needed
         font_data = None
         font_filename = None
 
-        if response.content[:2] == b'PK':  # ZIP file
+        if content[:2] == b'PK':  # ZIP file
             try:
-                with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+                with zipfile.ZipFile(io.BytesIO(content)) as zf:
                     # Find TTF or OTF files
                     font_files = [f for f in zf.namelist() if f.lower().endswith(('.ttf', '.otf'))]
 
                     if not font_files:
                         if self.verbose:
-                            print("      [X] No font files found in ZIP")
+                            self._log("      [X] No font files found in ZIP")
                         return False
 
                     # Check the first font file
@@ -196,71 +382,49 @@ class DaFontScraper:
 
             except Exception as e:
                 if self.verbose:
-                    print(f"      [X] Failed to extract ZIP: {e}")
+                    self._log(f"      [X] Failed to extract ZIP: {e}")
                 return False
         else:
             # Direct font file
-            font_data = response.content
+            font_data = content
             font_filename = "font"
 
         # Load and check the font
         try:
-            font = TTFont(io.BytesIO(font_data))
-            cmap = font.getBestCmap()
+            # lazy=True: only the tables we touch get decompiled, which here
+            # is just 'cmap' (glyf, GPOS, kern... are never parsed)
+            with TTFont(io.BytesIO(font_data), lazy=True) as font:
+                cmap = font.getBestCmap()
 
             if not cmap:
                 if self.verbose:
-                    print("      [X] No character map found in font")
+                    self._log("      [X] No character map found in font")
                 return False
 
         except Exception as e:
             if self.verbose:
-                print(f"      [X] Failed to load font: {e}")
+                self._log(f"      [X] Failed to load font: {e}")
             return False
 
-        # Check for Catalan-specific characters, numbers, and punctuation
-        catalan_chars = {
-            0x00B7: ('middle dot', '·'),
-            0x00E7: ('c with cedilla', 'ç'),
-            0x0030: ('0 (zero)', '0'),
-            0x0031: ('1 (one)', '1'),
-            0x0032: ('2 (two)', '2'),
-            0x0033: ('3 (three)', '3'),
-            0x0034: ('4 (four)', '4'),
-            0x0035: ('5 (five)', '5'),
-            0x0036: ('6 (six)', '6'),
-            0x0037: ('7 (seven)', '7'),
-            0x0038: ('8 (eight)', '8'),
-            0x0039: ('9 (nine)', '9'),
-            0x002D: ('hyphen-minus', '-'),
-            0x003C: ('less than', '<'),
-            0x003E: ('greater than', '>'),
-            0x0028: ('left parenthesis', '('),
-            0x0029: ('right parenthesis', ')'),
-        }
+        # STRICT REQUIREMENT: ALL required characters must be present (Catalan chars + numbers + punctuation)
+        # One C-level set operation decides; the per-character report is
+        # only built in verbose mode
+        supported = self.REQUIRED_CODEPOINTS.issubset(cmap.keys())
+
+        if self.verbose:
+            for codepoint, (name, char) in self.CATALAN_CHARS.items():
+                if codepoint in cmap:
+                    self._log(f"      [OK] Found {char} (U+{codepoint:04X}) - {name} [glyph: {cmap[codepoint]}]")
+                else:
+                    self._log(f"      [X] Missing {char} (U+{codepoint:04X}) - {name}")
 
-        results = {}
-        for codepoint, (name, char) in catalan_chars.items():
-            if codepoint in cmap:
-                glyph_name = cmap[codepoint]
-                results[codepoint] = True
-                if self.verbose:
-                    print(f"      [OK] Found {char} (U+{codepoint:04X}) - {name} [glyph: {glyph_name}]")
+            if supported:
+                self._log(f"      [ACCEPT] Font has all required characters (Catalan chars + numbers + punctuation)")
             else:
-                results[codepoint] = False
-                if self.verbose:
-                    print(f"      [X] Missing {char} (U+{codepoint:04X}) - {name}")
+                missing = [char for cp, (name, char) in self.CATALAN_CHARS.items() if cp not in cmap]
+                self._log(f"      [REJECT] Font missing: {', '.join(missing)}")
 
-        # STRICT REQUIREMENT: ALL required characters must be present (Catalan chars + numbers + punctuation)
-        if all(results.values()):
-            if self.verbose:
-                print(f"      [ACCEPT] Font has all required characters (Catalan chars + numbers + punctuation)")
-            return True
-        else:
-            if self.verbose:
-                missing = [f"{char}" for cp, (name, char) in catalan_chars.items() if not results.get(cp)]
-                print(f"      [REJECT] Font missing: {', '.join(missing)}")
-            return False
+        return supported
 
     def search_with_preview(self, search_text="l·l", category=""):
         """
@@ -309,12 +473,20 @@ def main():
     parser.add_argument('--output', default='catalan_fonts.csv', help='Output CSV file')
     parser.add_argument('--no-accent-filter', action='store_true',
                         help='Disable DaFont accent filter (include all fonts)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Fonts checked at once per category page (default: 4)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Cache fetched pages and font files in this directory across runs (default: no cache)')
+    parser.add_argument('--cache-ttl', type=float, default=24,
+                        help='Hours a cached page or font file stays valid (default: 24)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Show detailed character detection information')
 
     args = parser.parse_args()
 
-    scraper = DaFontScraper(use_accent_filter=not args.no_accent_filter, verbose=args.verbose)
+    scraper = DaFontScraper(use_accent_filter=not args.no_accent_filter, verbose=args.verbose,
+                            concurrency=args.concurrency, cache_dir=args.cache_dir,
+                            cache_ttl=args.cache_ttl * 3600)
 
     print("Starting DaFont scraper for Catalan fonts...")
     print("=" * 60)
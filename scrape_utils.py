@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas por los scripts de descarga (download_fonts.py,
+scrape_wikisource.py)
+"""
+
+import re
+import threading
+import time
+
+# Caracteres inválidos en nombres de archivo en Windows/Linux -> '_'
+INVALID_CHARS_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+WHITESPACE_RE = re.compile(r'\s+')
+
+def sanitize_filename(filename):
+    """Sanitiza el nombre del archivo eliminando caracteres inválidos"""
+    # Reemplazar caracteres inválidos en Windows/Linux
+    filename = filename.translate(INVALID_CHARS_TABLE)
+    # Eliminar espacios múltiples
+    filename = WHITESPACE_RE.sub('_', filename)
+    # Limitar longitud
+    return filename[:200]
+
+class RateLimiter:
+    """Garantiza un intervalo mínimo entre el inicio de dos peticiones (thread-safe)"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        """Bloquea hasta que toque el siguiente turno"""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if wait_time > 0:
+            time.sleep(wait_time)
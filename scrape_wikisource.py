@@ -5,47 +5,97 @@ Objetivo: Crear dataset sintético de líneas y palabras
 """
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 import json
 from urllib.parse import urljoin, urlparse
-import re
+from scrape_utils import RateLimiter, sanitize_filename
+
+try:
+    import lxml  # noqa: F401  (parser en C opcional, mucho más rápido que html.parser)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+def _has_class(*names):
+    """Filtro de clase para SoupStrainer que acepta atributos con varias clases"""
+    names = frozenset(names)
+    return lambda value: value is not None and not names.isdisjoint(value.split())
+
+# Construir solo las partes de cada página que se consultan
+CATEGORY_STRAINER = SoupStrainer('div', class_=_has_class('mw-category-group'))
+PAGELIST_STRAINER = SoupStrainer('div', class_=_has_class('prp-index-pagelist'))
+PAGE_TEXT_STRAINER = SoupStrainer('div', class_=_has_class('prp-page-qualityheader', 'pagetext'))
 
 class WikisourceScraper:
-    def __init__(self, output_dir='data', delay=1.0, verbose=False):
+    def __init__(self, output_dir='data', delay=1.0, verbose=False, workers=4, resume=True):
         self.base_url = "https://ca.wikisource.org"
         self.output_dir = Path(output_dir)
         self.delay = delay
         self.verbose = verbose
+        # Páginas descargadas a la vez; el rate limiter mantiene el intervalo
+        # mínimo entre peticiones para ser respetuosos con el servidor
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(delay)
+        # metadata.jsonl abierto de cada carpeta de libro (ver save_content)
+        self._metadata_files = {}
+        # Al reanudar se añade a los metadata.jsonl existentes; si no, se reescriben
+        self.resume = resume
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        # Una sesión keep-alive para todas las peticiones (sin un nuevo
+        # handshake TCP/TLS por página) y reintentos ante errores temporales
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers,
+                              max_retries=Retry(total=5, backoff_factor=0.5,
+                                                status_forcelist=(429, 500, 502, 503, 504)))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
         # Crear directorio de salida
         self.output_dir.mkdir(exist_ok=True)
 
+        # Índice de páginas ya guardadas (una URL por línea): al reanudar, las
+        # páginas presentes se saltan sin descargarlas ni parsearlas. No es un
+        # .txt para que verify_and_clean_books no lo tome por texto de un
+        # libro (y lo reescriba si un título contiene « »)
+        index_path = self.output_dir / 'scraped.lst'
+        self._scraped = set()
+        if resume and index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self._scraped = {line.rstrip('\n') for line in f if line.strip()}
+        # Con buffer de línea: cada página queda registrada aunque el proceso muera
+        self._index_file = open(index_path, 'a' if resume else 'w', encoding='utf-8', buffering=1)
+
     def get_page(self, url):
-        """Obtiene el contenido de una página"""
+        """
+        Obtiene el contenido de una página
+
+        Devuelve los bytes sin decodificar: el parser los lee directamente
+        (Wikisource siempre sirve UTF-8), sin pasar antes por un str
+        """
         try:
+            self.rate_limiter.wait()
             if self.verbose:
                 print(f"    Fetching: {url}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = self.session.get(url, timeout=15)
             response.raise_for_status()
-            return response.text
+            return response.content
         except Exception as e:
             print(f"    [ERROR] Error fetching {url}: {e}")
             return None
 
     def sanitize_filename(self, filename):
         """Sanitiza el nombre del archivo"""
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-        filename = re.sub(r'\s+', '_', filename)
-        if len(filename) > 200:
-            filename = filename[:200]
-        return filename
+        return sanitize_filename(filename)
 
     def get_validated_books(self):
         """Obtiene la lista de libros validados de la categoría"""
@@ -56,23 +106,18 @@ class WikisourceScraper:
         if not html:
             return []
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=CATEGORY_STRAINER, from_encoding='utf-8')
         books = []
 
-        # Buscar todos los grupos de categoría
-        category_groups = soup.find_all('div', class_='mw-category-group')
-
-        for group in category_groups:
-            # Encontrar todos los enlaces en el grupo
-            links = group.find_all('a')
-            for link in links:
-                if link.get('href'):
-                    book_url = urljoin(self.base_url, link['href'])
-                    book_title = link.get_text(strip=True)
-                    books.append({
-                        'title': book_title,
-                        'url': book_url
-                    })
+        # Todos los enlaces de los grupos de categoría, en una sola consulta
+        for link in soup.select('div.mw-category-group a[href]'):
+            if link['href']:
+                book_url = urljoin(self.base_url, link['href'])
+                book_title = link.get_text(strip=True)
+                books.append({
+                    'title': book_title,
+                    'url': book_url
+                })
 
         print(f"  [OK] Encontrados {len(books)} libros validados")
         return books
@@ -83,7 +128,7 @@ class WikisourceScraper:
         if not html:
             return []
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=PAGELIST_STRAINER, from_encoding='utf-8')
         validated_pages = []
 
         # Buscar la lista de páginas del índice
@@ -94,7 +139,7 @@ class WikisourceScraper:
             return []
 
         # Buscar enlaces con quality4 (páginas validadas)
-        quality4_links = pagelist.find_all('a', class_=lambda x: x and 'prp-pagequality-4' in x and 'quality4' in x)
+        quality4_links = pagelist.select('a.prp-pagequality-4.quality4')
 
         for link in quality4_links:
             if link.get('href'):
@@ -116,10 +161,10 @@ class WikisourceScraper:
         if not html:
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=PAGE_TEXT_STRAINER, from_encoding='utf-8')
 
         # Estructura: prp-page-qualityheader quality4 -> hermano pagetext -> dentro mw-content-ltr mw-parser-output
-        quality_header = soup.find('div', class_=lambda x: x and 'prp-page-qualityheader' in x and 'quality4' in x)
+        quality_header = soup.select_one('div.prp-page-qualityheader.quality4')
 
         if not quality_header:
             if self.verbose:
@@ -147,17 +192,22 @@ class WikisourceScraper:
         for tag in page_content(['script', 'style', 'sup', 'ref']):
             tag.decompose()
 
-        # Obtener texto
-        text = page_content.get_text(separator='\n', strip=True)
-
-        # Limpiar texto
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-
+        # Obtener texto línea a línea directamente de los fragmentos del árbol
+        # (sin unirlos en un solo str para volver a partirlo)
+        lines = []
+        for fragment in page_content.stripped_strings:
+            for line in fragment.split('\n'):
+                line = line.strip()
+                if line:
+                    lines.append(line)
+
+        # Las palabras se cuentan con un solo split sobre el texto ya unido
+        text = '\n'.join(lines)
         return {
-            'text': '\n'.join(lines),
+            'text': text,
             'lines': lines,
             'num_lines': len(lines),
-            'num_words': sum(len(line.split()) for line in lines)
+            'num_words': len(text.split())
         }
 
     def save_content(self, book_title, page_title, content, book_index, page_index):
@@ -175,9 +225,10 @@ class WikisourceScraper:
         with open(txt_file, 'w', encoding='utf-8') as f:
             f.write(content['text'])
 
-        # Guardar metadatos como JSON
-        json_file = book_dir / f"{page_index:04d}_{safe_page_name}.json"
+        # Guardar metadatos como una línea del metadata.jsonl del libro: un
+        # solo archivo abierto por libro en lugar de un .json por página
         metadata = {
+            'file': txt_file.name,
             'book_title': book_title,
             'page_title': page_title,
             'book_index': book_index,
@@ -185,12 +236,31 @@ class WikisourceScraper:
             'num_lines': content['num_lines'],
             'num_words': content['num_words']
         }
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        metadata_file = self._metadata_files.get(book_dir)
+        if metadata_file is None:
+            # Con buffer de línea, como el índice: la línea ya está en disco
+            # cuando mark_scraped registra la página, así que --resume nunca
+            # salta una página cuyos metadatos se perdieron en el buffer
+            metadata_file = open(book_dir / 'metadata.jsonl', 'a' if self.resume else 'w',
+                                 encoding='utf-8', buffering=1)
+            self._metadata_files[book_dir] = metadata_file
+        metadata_file.write(json.dumps(metadata, ensure_ascii=False) + '\n')
 
         if self.verbose:
             print(f"    [SAVED] {txt_file.name} ({content['num_lines']} líneas, {content['num_words']} palabras)")
 
+    def mark_scraped(self, page_url):
+        """Registra una página guardada en el índice scraped.lst"""
+        self._scraped.add(page_url)
+        self._index_file.write(page_url + '\n')
+
+    def close_files(self):
+        """Cierra los metadata.jsonl abiertos por save_content y el índice"""
+        for metadata_file in self._metadata_files.values():
+            metadata_file.close()
+        self._metadata_files.clear()
+        self._index_file.close()
+
     def scrape_all(self, max_books=None, start_from_book=None):
         """Scrape completo de Wikisource catalán"""
         print("=" * 60)
@@ -235,50 +305,63 @@ class WikisourceScraper:
         total_lines = 0
         total_words = 0
 
-        # Procesar cada libro
-        for book_idx, book in enumerate(books, 1):
-            print(f"\n[{book_idx}/{len(books)}] Libro: {book['title']}")
-            print(f"  URL: {book['url']}")
-
-            # Obtener páginas validadas
-            pages = self.get_validated_pages(book['url'])
-
-            if not pages:
-                print(f"  [SKIP] No hay páginas validadas")
-                continue
-
-            print(f"  [INFO] Procesando {len(pages)} páginas validadas...")
-
-            # Procesar cada página
-            for page_idx, page in enumerate(pages, 1):
-                if self.verbose:
-                    print(f"  [{page_idx}/{len(pages)}] Página: {page['title']}")
-
-                # Extraer contenido
-                content = self.extract_page_content(page['url'])
-
-                if content and content['num_lines'] > 0:
-                    # Guardar contenido
-                    self.save_content(
-                        book['title'],
-                        page['title'],
-                        content,
-                        book_idx,
-                        page_idx
-                    )
-
-                    total_pages += 1
-                    total_lines += content['num_lines']
-                    total_words += content['num_words']
-                else:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Procesar cada libro
+            for book_idx, book in enumerate(books, 1):
+                print(f"\n[{book_idx}/{len(books)}] Libro: {book['title']}")
+                print(f"  URL: {book['url']}")
+
+                # Obtener páginas validadas
+                pages = self.get_validated_pages(book['url'])
+
+                if not pages:
+                    print(f"  [SKIP] No hay páginas validadas")
+                    continue
+
+                print(f"  [INFO] Procesando {len(pages)} páginas validadas...")
+
+                # Páginas guardadas en una ejecución anterior (ver scraped.lst)
+                already_scraped = [page['url'] in self._scraped for page in pages]
+                num_skipped = sum(already_scraped)
+                if num_skipped:
+                    print(f"  [INFO] {num_skipped} páginas ya guardadas, se saltan")
+
+                # Descargar y extraer las páginas en paralelo (la espera de red de
+                # cada una se solapa con las demás); map conserva el orden, así que
+                # se guardan en el hilo principal con la misma numeración
+                contents = executor.map(self.extract_page_content,
+                                        [page['url'] for page, done in zip(pages, already_scraped) if not done])
+
+                # Procesar cada página
+                for page_idx, (page, done) in enumerate(zip(pages, already_scraped), 1):
+                    if done:
+                        continue
+                    content = next(contents)
                     if self.verbose:
-                        print(f"    [SKIP] Sin contenido válido")
-
-                # Delay entre páginas
-                time.sleep(self.delay)
-
-            # Delay entre libros
-            time.sleep(self.delay * 2)
+                        print(f"  [{page_idx}/{len(pages)}] Página: {page['title']}")
+
+                    if content and content['num_lines'] > 0:
+                        # Guardar contenido
+                        self.save_content(
+                            book['title'],
+                            page['title'],
+                            content,
+                            book_idx,
+                            page_idx
+                        )
+                        self.mark_scraped(page['url'])
+
+                        total_pages += 1
+                        total_lines += content['num_lines']
+                        total_words += content['num_words']
+                    else:
+                        if self.verbose:
+                            print(f"    [SKIP] Sin contenido válido")
+
+                # Delay entre libros
+                time.sleep(self.delay * 2)
+
+        self.close_files()
 
         # Resumen final
         print("\n" + "=" * 60)
@@ -298,7 +381,12 @@ def main():
     parser.add_argument('--output-dir', default='data', help='Directorio de salida (default: data)')
     parser.add_argument('--max-books', type=int, default=None, help='Número máximo de libros a procesar')
     parser.add_argument('--start-from-book', type=str, default=None, help='Título del libro desde el cual empezar (scrapeará desde el siguiente)')
-    parser.add_argument('--delay', type=float, default=1.0, help='Delay entre requests en segundos (default: 1.0)')
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help='Intervalo mínimo en segundos entre el inicio de dos requests (default: 1.0)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Páginas descargadas a la vez (default: 4)')
+    parser.add_argument('--rescrape', action='store_true',
+                        help='Volver a descargar las páginas ya guardadas (ignora scraped.lst)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar información detallada')
 
     args = parser.parse_args()
@@ -306,10 +394,16 @@ def main():
     scraper = WikisourceScraper(
         output_dir=args.output_dir,
         delay=args.delay,
-        verbose=args.verbose
+        verbose=args.verbose,
+        workers=args.workers,
+        resume=not args.rescrape
     )
 
-    scraper.scrape_all(max_books=args.max_books, start_from_book=args.start_from_book)
+    try:
+        scraper.scrape_all(max_books=args.max_books, start_from_book=args.start_from_book)
+    finally:
+        scraper.close_files()
+        scraper.session.close()
 
 if __name__ == "__main__":
     main()
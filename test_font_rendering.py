@@ -4,6 +4,8 @@ Test font rendering to detect fonts that have character mapping but fail to rend
 """
 
 from PIL import Image, ImageDraw, ImageFont
+from fontTools.ttLib import TTFont
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 
@@ -18,22 +20,19 @@ def test_font_rendering(font_path, test_string="0123456789·çAaBbÇç", font_si
         # Load font
         font = ImageFont.truetype(str(font_path), font_size)
 
-        # Create test image
-        img = Image.new('RGB', (800, 100), 'white')
-        draw = ImageDraw.Draw(img)
-
-        # Try to draw the test string
-        draw.text((10, 10), test_string, font=font, fill='black')
+        # Try to render the test string (straight to a glyph mask: no
+        # canvas or ImageDraw is needed, the pixels are never inspected)
+        font.getmask(test_string)
 
         # Check if any character was replaced by .notdef (unknown glyph)
         # PIL doesn't give direct access to this, but we can check the rendered image
         # For a more thorough check, we test individual characters
 
         missing_chars = []
-        for char in test_string:
+        for char in dict.fromkeys(test_string):
             try:
                 # Try to get bounding box for this character
-                bbox = draw.textbbox((0, 0), char, font=font)
+                bbox = font.getbbox(char)
                 width = bbox[2] - bbox[0]
 
                 # If width is 0 or very small, the glyph might be missing
@@ -50,8 +49,34 @@ def test_font_rendering(font_path, test_string="0123456789·çAaBbÇç", font_si
     except Exception as e:
         return False, f"Error loading font: {str(e)}"
 
-def scan_fonts(fonts_dir='fonts', verbose=False):
-    """Scan all fonts and test rendering"""
+def check_font_cmap(font_path, test_string="0123456789·çAaBbÇç"):
+    """
+    Quick check: are all characters in the font's cmap? (nothing is rendered)
+
+    Much cheaper than test_font_rendering, but it cannot see glyphs that are
+    mapped and still fail to render
+
+    Returns:
+        (bool, str): (success, message/error)
+    """
+    try:
+        # lazy: only the tables we read (cmap) are parsed
+        with TTFont(str(font_path), lazy=True) as font:
+            cmap = font.getBestCmap()
+    except Exception as e:
+        return False, f"Error loading font: {str(e)}"
+
+    if not cmap:
+        return False, "No character map found"
+
+    missing_chars = [char for char in dict.fromkeys(test_string) if ord(char) not in cmap]
+    if missing_chars:
+        return False, f"Not in cmap: {', '.join(missing_chars)}"
+
+    return True, "All characters are mapped"
+
+def scan_fonts(fonts_dir='fonts', verbose=False, workers=8, cmap_only=False):
+    """Scan all fonts and test rendering (or only their cmap with cmap_only)"""
     fonts_dir = Path(fonts_dir)
 
     print("=" * 60)
@@ -68,9 +93,14 @@ def scan_fonts(fonts_dir='fonts', verbose=False):
 
     print(f"Testing {len(font_files)} fonts...\n")
 
-    for font_path in font_files:
+    # Fonts are independent: test several at once (map keeps the order of
+    # the results, so the output is the same as a serial run)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        check = check_font_cmap if cmap_only else test_font_rendering
+        results = list(executor.map(check, font_files))
+
+    for font_path, (success, message) in zip(font_files, results):
         rel_path = font_path.relative_to(fonts_dir)
-        success, message = test_font_rendering(font_path)
 
         if success:
             valid_count += 1
@@ -132,6 +162,9 @@ if __name__ == "__main__":
     parser.add_argument('--test-string', default='0123456789·çAaBb',
                         help='String to test rendering')
     parser.add_argument('--output', type=str, help='Output test image (only with --font)')
+    parser.add_argument('--workers', type=int, default=8, help='Fonts tested at once (default: 8)')
+    parser.add_argument('--cmap-only', action='store_true',
+                        help='Only check that the test characters are in each font cmap (fast, no rendering)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Show all fonts')
 
     args = parser.parse_args()
@@ -141,4 +174,4 @@ if __name__ == "__main__":
         test_single_font(args.font, args.test_string, args.output)
     else:
         # Scan all fonts
-        scan_fonts(args.fonts_dir, args.verbose)
+        scan_fonts(args.fonts_dir, args.verbose, args.workers, args.cmap_only)
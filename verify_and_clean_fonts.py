@@ -5,39 +5,145 @@ Remove fonts that don't support all required characters.
 """
 
 import os
-import shutil
+import json
+import platform
+import multiprocessing as mp
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice, product
 from pathlib import Path
 from fontTools.ttLib import TTFont
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
 from tqdm import tqdm
 import argparse
 
+# Required characters
+REQUIRED_CHARS = {
+    0x00B7: ('middle dot', '·'),
+    0x00E7: ('c with cedilla', 'ç'),
+    0x0030: ('0 (zero)', '0'),
+    0x0031: ('1 (one)', '1'),
+    0x0032: ('2 (two)', '2'),
+    0x0033: ('3 (three)', '3'),
+    0x0034: ('4 (four)', '4'),
+    0x0035: ('5 (five)', '5'),
+    0x0036: ('6 (six)', '6'),
+    0x0037: ('7 (seven)', '7'),
+    0x0038: ('8 (eight)', '8'),
+    0x0039: ('9 (nine)', '9'),
+    0x002D: ('hyphen-minus', '-'),
+    0x003C: ('less than', '<'),
+    0x003E: ('greater than', '>'),
+    0x0028: ('left parenthesis', '('),
+    0x0029: ('right parenthesis', ')'),
+}
+
+# Font extensions in every upper/lower case combination, so a 4-character
+# slice of the name is checked without lowercasing the whole name
+FONT_EXTENSIONS = frozenset(
+    '.' + ''.join(variant)
+    for ext in ('ttf', 'otf')
+    for variant in product(*((c, c.upper()) for c in ext))
+)
+
+# Prefix of results from the outer except of _check_font_file: the font could
+# not be read at all (permissions, I/O, truncated file), so the result is not
+# a verdict on the font and is never cached
+ERROR_PREFIX = "Error: "
+
+def _check_font_file(font_path, required_chars=REQUIRED_CHARS):
+    """
+    Check if a font file supports all required characters
+    Uses both cmap check AND actual rendering test
+
+    Module-level (not a method) so worker processes can run it
+    """
+    try:
+        # Step 1: Check cmap (character mapping table)
+        # lazy=True reads tables from the file on demand: only cmap is parsed,
+        # and the file is not copied into memory first
+        with TTFont(str(font_path), lazy=True) as font:
+            cmap = font.getBestCmap()
+
+        if not cmap:
+            return False, "No character map found"
+
+        # Check for all required characters in cmap: one C-level subset test
+        # on the key views, the missing list is only built for failing fonts
+        if not cmap.keys() >= required_chars.keys():
+            missing_in_cmap = [char for codepoint, (name, char) in required_chars.items()
+                               if codepoint not in cmap]
+            return False, f"Missing in cmap: {', '.join(missing_in_cmap)}"
+
+        # Step 2: Test actual rendering with PIL (more robust check)
+        # This catches fonts that have cmap entries but fail to render
+        try:
+            # Single characters need no shaping: the basic layout skips the
+            # HarfBuzz (raqm) pass that each getbbox call would otherwise run
+            pil_font = ImageFont.truetype(str(font_path), 32,
+                                          layout_engine=ImageFont.Layout.BASIC)
+
+            # Test each required character (the bbox is a font metric call:
+            # no test image or ImageDraw is needed)
+            cannot_render = []
+            for codepoint, (name, char) in required_chars.items():
+                try:
+                    # Try to get bounding box - if it fails, font can't render it
+                    bbox = pil_font.getbbox(char)
+                    width = bbox[2] - bbox[0]
+
+                    # Some fonts have glyphs with 0 width for missing chars
+                    if width <= 0:
+                        cannot_render.append(char)
+
+                except Exception:
+                    cannot_render.append(char)
+
+            if cannot_render:
+                return False, f"Cannot render: {', '.join(cannot_render)}"
+
+        except Exception as e:
+            return False, f"PIL rendering error: {str(e)}"
+
+        return True, "All characters supported and renderable"
+
+    except Exception as e:
+        return False, f"{ERROR_PREFIX}{str(e)}"
+
+def _check_font_files(font_paths, required_chars=REQUIRED_CHARS):
+    """Check a chunk of fonts in one worker task (one round trip per chunk)"""
+    return [_check_font_file(font_path, required_chars) for font_path in font_paths]
+
+def _in_input_order(order, results):
+    """Yield results computed in `order` (a permutation of input indices) back in input order"""
+    pending = {}
+    positions = iter(order)
+    for index in range(len(order)):
+        while index not in pending:
+            pending[next(positions)] = next(results)
+        yield pending.pop(index)
+
+def _unlink(path):
+    """Delete one file, returning the error instead of raising it"""
+    try:
+        os.unlink(path)
+    except OSError as e:
+        return e
+    return None
+
 class FontVerifier:
-    def __init__(self, fonts_dir='fonts', verbose=False, dry_run=False):
+    def __init__(self, fonts_dir='fonts', verbose=False, dry_run=False, num_workers=1, use_cache=True):
         self.fonts_dir = Path(fonts_dir)
         self.verbose = verbose
         self.dry_run = dry_run
+        self.num_workers = max(1, num_workers)
+        # Results of previous runs, keyed by relative path and valid while the
+        # file's mtime and size are unchanged (see load_cache)
+        self.use_cache = use_cache
+        self.cache_path = self.fonts_dir / '.font_verify_cache.json'
 
         # Required characters
-        self.required_chars = {
-            0x00B7: ('middle dot', '·'),
-            0x00E7: ('c with cedilla', 'ç'),
-            0x0030: ('0 (zero)', '0'),
-            0x0031: ('1 (one)', '1'),
-            0x0032: ('2 (two)', '2'),
-            0x0033: ('3 (three)', '3'),
-            0x0034: ('4 (four)', '4'),
-            0x0035: ('5 (five)', '5'),
-            0x0036: ('6 (six)', '6'),
-            0x0037: ('7 (seven)', '7'),
-            0x0038: ('8 (eight)', '8'),
-            0x0039: ('9 (nine)', '9'),
-            0x002D: ('hyphen-minus', '-'),
-            0x003C: ('less than', '<'),
-            0x003E: ('greater than', '>'),
-            0x0028: ('left parenthesis', '('),
-            0x0029: ('right parenthesis', ')'),
-        }
+        self.required_chars = REQUIRED_CHARS
 
         self.stats = {
             'total_fonts': 0,
@@ -48,61 +154,43 @@ class FontVerifier:
         }
 
         self.invalid_fonts = []  # Store info about invalid fonts
+        self._by_category = None  # Cached grouping of invalid_fonts (see group_by_category)
 
     def check_font_file(self, font_path):
-        """
-        Check if a font file supports all required characters
-        Uses both cmap check AND actual rendering test
-        """
-        try:
-            # Step 1: Check cmap (character mapping table)
-            font = TTFont(str(font_path))
-            cmap = font.getBestCmap()
-
-            if not cmap:
-                return False, "No character map found"
-
-            # Check for all required characters in cmap
-            missing_in_cmap = []
-            for codepoint, (name, char) in self.required_chars.items():
-                if codepoint not in cmap:
-                    missing_in_cmap.append(char)
+        """Check one font (see _check_font_file)"""
+        return _check_font_file(font_path, self.required_chars)
 
-            if missing_in_cmap:
-                return False, f"Missing in cmap: {', '.join(missing_in_cmap)}"
-
-            # Step 2: Test actual rendering with PIL (more robust check)
-            # This catches fonts that have cmap entries but fail to render
-            try:
-                pil_font = ImageFont.truetype(str(font_path), 32)
-                test_img = Image.new('RGB', (200, 50), 'white')
-                draw = ImageDraw.Draw(test_img)
-
-                # Test each required character
-                cannot_render = []
-                for codepoint, (name, char) in self.required_chars.items():
-                    try:
-                        # Try to get bounding box - if it fails, font can't render it
-                        bbox = draw.textbbox((0, 0), char, font=pil_font)
-                        width = bbox[2] - bbox[0]
-
-                        # Some fonts have glyphs with 0 width for missing chars
-                        if width <= 0:
-                            cannot_render.append(char)
-
-                    except Exception:
-                        cannot_render.append(char)
-
-                if cannot_render:
-                    return False, f"Cannot render: {', '.join(cannot_render)}"
-
-            except Exception as e:
-                return False, f"PIL rendering error: {str(e)}"
-
-            return True, "All characters supported and renderable"
+    def load_cache(self):
+        """Load the verification cache ({} if missing, unreadable or for other required chars)"""
+        if not self.use_cache:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # A cache with an unexpected structure is ignored, not trusted
+        if not isinstance(cache, dict) or cache.get('required_chars') != self._required_chars_key():
+            return {}
+        fonts = cache.get('fonts')
+        return fonts if isinstance(fonts, dict) else {}
+
+    def save_cache(self, fonts):
+        """Write the verification cache atomically (only fonts seen in this run)"""
+        if not self.use_cache:
+            return
+        data = {'required_chars': self._required_chars_key(), 'fonts': fonts}
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"  [WARNING] Could not write verification cache: {e}")
 
-        except Exception as e:
-            return False, f"Error: {str(e)}"
+    def _required_chars_key(self):
+        """Cached results are only valid for the same set of required characters"""
+        return ''.join(char for name, char in self.required_chars.values())
 
     def get_all_font_files(self):
         """Get all font files from fonts directory"""
@@ -112,22 +200,42 @@ class FontVerifier:
             print(f"[ERROR] Fonts directory not found: {self.fonts_dir}")
             return []
 
-        # Traverse all subdirectories
-        for root, dirs, files in os.walk(self.fonts_dir):
-            for file in files:
-                if file.lower().endswith(('.ttf', '.otf')):
-                    font_path = Path(root) / file
-                    # Get relative path from fonts_dir
-                    rel_path = font_path.relative_to(self.fonts_dir)
-                    font_files.append({
-                        'path': font_path,
-                        'relative': rel_path,
-                        'category': rel_path.parts[0] if len(rel_path.parts) > 1 else 'Unknown',
-                        'font_folder': rel_path.parts[1] if len(rel_path.parts) > 2 else rel_path.parts[0]
-                    })
+        # Paths stay plain strings: DirEntry already carries the full path,
+        # and the relative path is a slice of it (no Path per file)
+        root = str(self.fonts_dir)
+        prefix_len = len(os.path.join(root, ''))
+        for path in self._iter_font_files(root):
+            rel_path = path[prefix_len:]
+            parts = rel_path.split(os.sep)
+            font_files.append({
+                'path': path,
+                'relative': rel_path,
+                'category': parts[0] if len(parts) > 1 else 'Unknown',
+                'font_folder': parts[1] if len(parts) > 2 else parts[0]
+            })
 
         return font_files
 
+    def _iter_font_files(self, directory):
+        """Yield .ttf/.otf paths under directory, in os.walk order (files first)"""
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                # Like os.walk: symlinked directories are not followed
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif entry.name[-4:] in FONT_EXTENSIONS:
+                yield entry.path
+
+        for subdir in subdirs:
+            yield from self._iter_font_files(subdir)
+
     def verify_all_fonts(self):
         """Verify all fonts in the fonts directory"""
         print("=" * 60)
@@ -149,25 +257,107 @@ class FontVerifier:
         # Verify each font
         print(f"\n[2] Verifying fonts...")
 
-        for font_info in tqdm(font_files, desc="Checking fonts", unit="font"):
-            font_path = font_info['path']
-            is_valid, message = self.check_font_file(font_path)
+        self._by_category = None
 
-            if is_valid:
-                self.stats['valid_fonts'] += 1
-                if self.verbose:
-                    print(f"  [OK] {font_info['relative']}")
+        # Reuse the result of fonts unchanged since the last run (same mtime
+        # and size): only a stat per font instead of parsing and rendering it
+        cache = self.load_cache()
+        new_cache = {}
+        cached_results = []
+        for font_info in font_files:
+            key = str(font_info['relative'])
+            try:
+                st = os.stat(font_info['path'])
+                signature = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                signature = None
+            font_info['cache_key'] = key
+            font_info['signature'] = signature
+            entry = cache.get(key)
+            if (signature is not None and isinstance(entry, dict)
+                    and entry.get('signature') == signature
+                    and isinstance(entry.get('valid'), bool)
+                    and isinstance(entry.get('message'), str)
+                    and not entry['message'].startswith(ERROR_PREFIX)):
+                cached_results.append((entry['valid'], entry['message']))
             else:
-                self.stats['invalid_fonts'] += 1
-                self.invalid_fonts.append({
-                    'path': font_path,
-                    'relative': font_info['relative'],
-                    'category': font_info['category'],
-                    'font_folder': font_info['font_folder'],
-                    'reason': message
-                })
-                if self.verbose:
-                    print(f"  [X] {font_info['relative']} - {message}")
+                cached_results.append(None)
+
+        num_cached = sum(result is not None for result in cached_results)
+        if num_cached:
+            print(f"  [INFO] {num_cached} fonts unchanged since the last run (cached result)")
+
+        # Each font is independent and the check is CPU-bound (fontTools and
+        # PIL), so with several workers it runs in a process pool. Results are
+        # consumed in input order, so stats and output match a serial run
+        to_check = [font_info for font_info, cached in zip(font_files, cached_results)
+                    if cached is None]
+        font_paths = [font_info['path'] for font_info in to_check]
+        executor = None
+        futures = []
+        if self.num_workers > 1:
+            # Windows requires 'spawn'; elsewhere 'forkserver' starts clean
+            # workers that only receive the paths they check
+            if platform.system() == 'Windows':
+                ctx = mp.get_context('spawn')
+            else:
+                ctx = mp.get_context('forkserver')
+            chunksize = max(1, min(16, len(font_paths) // (self.num_workers * 4)))
+            executor = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=ctx)
+            # Largest files first: the slow fonts (CJK, big families) start
+            # early instead of leaving one worker busy at the end of the run
+            order = sorted(range(len(to_check)), reverse=True,
+                           key=lambda i: to_check[i]['signature'][1] if to_check[i]['signature'] else 0)
+            # One future per chunk (instead of executor.map) so the chunks not
+            # started yet can be cancelled if the run stops early
+            ordered_paths = [font_paths[i] for i in order]
+            futures = [executor.submit(_check_font_files, ordered_paths[start:start + chunksize],
+                                       self.required_chars)
+                       for start in range(0, len(ordered_paths), chunksize)]
+            checked = _in_input_order(order, chain.from_iterable(
+                future.result() for future in futures))
+        else:
+            checked = map(self.check_font_file, font_paths)
+
+        # Cached results in place, the rest in order from the checks
+        results = (cached if cached is not None else next(checked) for cached in cached_results)
+
+        # try/finally: the pool is shut down even if the loop fails or is
+        # interrupted (cancelling the checks not started yet). The bar only
+        # redraws after 0.5% of the fonts and 0.25 s: cached results arrive
+        # faster than per-font refreshes are worth
+        try:
+            for font_info, (is_valid, message) in tqdm(zip(font_files, results), total=len(font_files),
+                                                       desc="Checking fonts", unit="font",
+                                                       miniters=max(1, len(font_files) // 200),
+                                                       mininterval=0.25):
+                if font_info['signature'] is not None and not message.startswith(ERROR_PREFIX):
+                    new_cache[font_info['cache_key']] = {
+                        'signature': font_info['signature'],
+                        'valid': is_valid,
+                        'message': message
+                    }
+
+                if is_valid:
+                    self.stats['valid_fonts'] += 1
+                    if self.verbose:
+                        print(f"  [OK] {font_info['relative']}")
+                else:
+                    self.stats['invalid_fonts'] += 1
+                    # The scan entry already holds path, category and folder: add
+                    # the reason to it instead of copying them into a new dict
+                    font_info['reason'] = message
+                    self.invalid_fonts.append(font_info)
+                    if self.verbose:
+                        print(f"  [X] {font_info['relative']} - {message}")
+        finally:
+            if executor is not None:
+                # Cancel the chunks not started yet, then wait for the running ones
+                for future in futures:
+                    future.cancel()
+                executor.shutdown()
+
+        self.save_cache(new_cache)
 
         # Summary
         print(f"\n[3] Verification Summary:")
@@ -177,15 +367,7 @@ class FontVerifier:
 
         if self.invalid_fonts:
             print(f"\n[4] Invalid fonts by category:")
-            # Group by category
-            by_category = {}
-            for font in self.invalid_fonts:
-                cat = font['category']
-                if cat not in by_category:
-                    by_category[cat] = []
-                by_category[cat].append(font)
-
-            for category, fonts in sorted(by_category.items()):
+            for category, fonts in self.group_by_category():
                 print(f"  {category}: {len(fonts)} fonts")
                 if self.verbose:
                     for font in fonts[:5]:  # Show first 5
@@ -193,6 +375,20 @@ class FontVerifier:
                     if len(fonts) > 5:
                         print(f"    ... and {len(fonts) - 5} more")
 
+    def group_by_category(self):
+        """
+        Group invalid_fonts by category, computed once for the summary and the report
+
+        Returns:
+            Sorted list of (category, fonts)
+        """
+        if self._by_category is None:
+            by_category = defaultdict(list)
+            for font in self.invalid_fonts:
+                by_category[font['category']].append(font)
+            self._by_category = sorted(by_category.items())
+        return self._by_category
+
     def remove_invalid_fonts(self):
         """Remove invalid font folders"""
         if not self.invalid_fonts:
@@ -208,27 +404,85 @@ class FontVerifier:
         folders_to_remove = set()
         for font in self.invalid_fonts:
             # Get the font folder path (category/font_name)
-            font_folder = font['path'].parent
+            font_folder = Path(os.path.dirname(font['path']))
             folders_to_remove.add(font_folder)
 
-        for folder in tqdm(sorted(folders_to_remove), desc="Removing folders", unit="folder"):
-            try:
-                if self.dry_run:
-                    print(f"  [DRY RUN] Would remove: {folder.relative_to(self.fonts_dir)}")
-                else:
-                    shutil.rmtree(folder)
-                    self.stats['removed_fonts'] += 1
-                    if self.verbose:
-                        print(f"  [REMOVED] {folder.relative_to(self.fonts_dir)}")
-            except Exception as e:
-                self.stats['errors'] += 1
-                print(f"  [ERROR] Failed to remove {folder.relative_to(self.fonts_dir)}: {e}")
+        if self.dry_run:
+            for folder in tqdm(sorted(folders_to_remove), desc="Removing folders", unit="folder"):
+                print(f"  [DRY RUN] Would remove: {folder.relative_to(self.fonts_dir)}")
+        else:
+            self._delete_folders(sorted(folders_to_remove))
 
         if not self.dry_run:
             print(f"\n  [OK] Removed {self.stats['removed_fonts']} font folders")
             if self.stats['errors'] > 0:
                 print(f"  [WARNING] {self.stats['errors']} errors occurred")
 
+    def _delete_folders(self, folders):
+        """
+        Delete whole font folders: one scandir walk collects every file, the
+        unlinks run in a thread pool (each one is a syscall waiting on disk)
+        and the emptied directories are removed deepest first
+        """
+        # A folder nested in another one goes away with its parent (sorted
+        # paths keep each parent right before its subfolders)
+        roots = []
+        for folder in folders:
+            if roots:
+                # relative_to instead of is_relative_to (Python 3.9+)
+                try:
+                    folder.relative_to(roots[-1])
+                    continue
+                except ValueError:
+                    pass
+            roots.append(folder)
+
+        trees = []
+        for folder in roots:
+            files, dirs = [], []
+            try:
+                self._collect_tree(str(folder), files, dirs)
+                error = None
+            except OSError as e:
+                files, dirs, error = [], [], e
+            trees.append((folder, files, dirs, error))
+
+        # map keeps the input order: each folder takes its own results in turn
+        # while the pool keeps deleting the files of the next ones
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            unlinked = executor.map(_unlink, [path for _, files, _, _ in trees for path in files])
+
+            for folder, files, dirs, error in tqdm(trees, desc="Removing folders", unit="folder"):
+                for unlink_error in islice(unlinked, len(files)):
+                    if error is None:
+                        error = unlink_error
+                if error is None:
+                    try:
+                        for directory in reversed(dirs):
+                            os.rmdir(directory)
+                    except OSError as e:
+                        error = e
+
+                if error is None:
+                    self.stats['removed_fonts'] += 1
+                    if self.verbose:
+                        print(f"  [REMOVED] {folder.relative_to(self.fonts_dir)}")
+                else:
+                    self.stats['errors'] += 1
+                    print(f"  [ERROR] Failed to remove {folder.relative_to(self.fonts_dir)}: {error}")
+
+    def _collect_tree(self, directory, files, dirs):
+        """Append everything under directory: its files and subdirectories (parents first)"""
+        dirs.append(directory)
+        with os.scandir(directory) as it:
+            entries = list(it)
+        for entry in entries:
+            # Like shutil.rmtree: a symlink to a directory is unlinked, not followed
+            if entry.is_dir(follow_symlinks=False):
+                self._collect_tree(entry.path, files, dirs)
+            else:
+                files.append(entry.path)
+
     def generate_report(self, output_file='font_verification_report.txt'):
         """Generate a detailed report of invalid fonts"""
         if not self.invalid_fonts:
@@ -249,15 +503,7 @@ class FontVerifier:
             f.write("INVALID FONTS DETAILS\n")
             f.write("=" * 60 + "\n\n")
 
-            # Group by category
-            by_category = {}
-            for font in self.invalid_fonts:
-                cat = font['category']
-                if cat not in by_category:
-                    by_category[cat] = []
-                by_category[cat].append(font)
-
-            for category, fonts in sorted(by_category.items()):
+            for category, fonts in self.group_by_category():
                 f.write(f"\n{category} ({len(fonts)} fonts)\n")
                 f.write("-" * 60 + "\n")
                 for font in fonts:
@@ -267,6 +513,24 @@ class FontVerifier:
 
         print(f"  [OK] Report saved to {output_file}")
 
+    def generate_json_report(self, output_file):
+        """Write the stats and invalid fonts as JSON, for scripts that consume the results"""
+        print(f"\n[6] Generating JSON report: {output_file}")
+
+        report = {
+            'stats': self.stats,
+            'invalid_fonts': [{
+                'path': str(font['relative']),
+                'category': font['category'],
+                'font_folder': font['font_folder'],
+                'reason': font['reason']
+            } for font in self.invalid_fonts]
+        }
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
+
+        print(f"  [OK] JSON report saved to {output_file}")
+
 def main():
     parser = argparse.ArgumentParser(
         description='Verify and clean fonts that don\'t support Catalan characters, numbers, and punctuation'
@@ -276,13 +540,24 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='Show what would be removed without actually removing')
     parser.add_argument('--no-remove', action='store_true', help='Only verify, don\'t remove invalid fonts')
     parser.add_argument('--report', default='font_verification_report.txt', help='Output report file')
+    parser.add_argument('--json-report', help='Also write the results as JSON to this file')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Check every font again, ignoring results cached by previous runs')
+    parser.add_argument('--workers', '-j', type=int, default=-1,
+                        help='Number of parallel processes (default: -1, all cores)')
 
     args = parser.parse_args()
 
+    num_workers = args.workers
+    if num_workers == -1:
+        num_workers = mp.cpu_count()
+
     verifier = FontVerifier(
         fonts_dir=args.fonts_dir,
         verbose=args.verbose,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        num_workers=num_workers,
+        use_cache=not args.no_cache
     )
 
     # Verify all fonts
@@ -291,6 +566,8 @@ def main():
     # Generate report if there are invalid fonts
     if verifier.invalid_fonts:
         verifier.generate_report(args.report)
+    if args.json_report:
+        verifier.generate_json_report(args.json_report)
 
     # Remove invalid fonts unless --no-remove is specified
     if not args.no_remove: